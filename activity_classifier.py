@@ -0,0 +1,85 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+ACTIVITY_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'activity_rules.json')
+
+# Used when the config file is missing. Order = priority (first matching rule wins).
+DEFAULT_ACTIVITY_RULES = {
+    'default': 'Operating',
+    'rules': [
+        {'name': 'Non Netting AP', 'activity': 'Operating', 'keywords': ['Non Netting AP']},
+        {'name': 'Financing', 'activity': 'Financing', 'keywords': ['Intercompany', 'Dividend', 'Equity', 'Loan', 'Interest', 'Financing', 'Treasury']},
+        {'name': 'Investing', 'activity': 'Investing', 'keywords': ['Capex', 'Asset', 'Invest', 'Acquisition']},
+        {'name': 'Other', 'activity': 'Operating', 'keywords': ['Other']},
+    ]
+}
+
+
+def load_activity_rules(path=ACTIVITY_RULES_PATH):
+    """Load the keyword rule set from JSON, falling back to the built-in rules."""
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return DEFAULT_ACTIVITY_RULES
+
+
+class ActivityClassifier:
+    """
+    Keyword rule engine for the Operating / Investing / Financing split.
+    All rules are compiled into ONE case-insensitive regex. Each rule is an
+    alternative guarded by a lookahead, tried in priority order, so the first
+    rule with any keyword anywhere in the text wins (not the leftmost keyword).
+    """
+
+    def __init__(self, rules=None):
+        rules = rules if rules is not None else load_activity_rules()
+        self.default = rules.get('default', 'Operating')
+        self.rules = [r for r in rules.get('rules', []) if r.get('keywords')]
+
+        branches = []
+        for i, rule in enumerate(self.rules):
+            kw = '|'.join(re.escape(k) for k in rule['keywords'])
+            branches.append(f"(?=.*?(?:{kw}))(?P<r{i}>)")
+        self._pattern = re.compile('^(?:' + '|'.join(branches) + ')', re.IGNORECASE | re.DOTALL) if branches else None
+
+        # Stable category order for the output Categorical
+        labels = [self.default] + [r['activity'] for r in self.rules]
+        self.labels = list(dict.fromkeys(labels))
+
+    def match_rule(self, text):
+        """Index of the winning rule for one string, or -1 for the default."""
+        if self._pattern is None:
+            return -1
+        m = self._pattern.match(text)
+        if m is None:
+            return -1
+        return int(m.lastgroup[1:])
+
+    def classify(self, values):
+        """
+        Classify a Series. Only distinct values are matched (tens of categories),
+        then broadcast back to every row through the factorized codes.
+        Returns (activity Categorical Series, per-rule row counts).
+        """
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        rule_idx = np.array([self.match_rule(str(u)) for u in uniques], dtype=int)
+
+        label_pos = {label: i for i, label in enumerate(self.labels)}
+        unique_codes = np.array(
+            [label_pos[self.rules[r]['activity']] if r >= 0 else label_pos[self.default] for r in rule_idx],
+            dtype=np.int8
+        )
+
+        # Missing categories are kept as their own unique value and fall through to the default
+        activity = pd.Series(
+            pd.Categorical.from_codes(unique_codes[codes], categories=self.labels),
+            index=values.index, name='Activity'
+        )
+
+        rows_per_unique = np.bincount(codes, minlength=len(uniques))
+        hits = {rule['name']: int(rows_per_unique[rule_idx == i].sum()) for i, rule in enumerate(self.rules)}
+        return activity, hits
@@ -0,0 +1,132 @@
+import os
+import pickle
+import warnings
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Bounded (p, d, q) search space
+ARIMA_P = range(0, 3)
+ARIMA_D = range(0, 2)
+ARIMA_Q = range(0, 3)
+# Fitted models per series, one pickle per series key
+ARIMA_CACHE_DIR = '.cache/arima'
+
+
+def _arima():
+    """statsmodels' ARIMA, imported on first use (the import alone takes ~0.6s)."""
+    from statsmodels.tsa.arima.model import ARIMA
+    return ARIMA
+
+
+def candidate_orders(p=ARIMA_P, d=ARIMA_D, q=ARIMA_Q):
+    return list(itertools.product(p, d, q))
+
+
+def fit_candidate(values, order, start_params=None):
+    """Fit one ARIMA order; returns (order, aic, bic, params) or (order, inf, inf, None) on failure."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            result = _arima()(values, order=order).fit(start_params=start_params)
+        except Exception:
+            return order, np.inf, np.inf, None
+    if not np.isfinite(result.aic):
+        return order, np.inf, np.inf, None
+    return order, float(result.aic), float(result.bic), np.asarray(result.params)
+
+
+def refit(values, order, params):
+    """Results object for known parameters (no optimisation)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return _arima()(values, order=order).filter(params)
+
+
+class ArimaEngine:
+    """
+    ARIMA with the order picked by information criterion over candidate_orders().
+    Candidates are fitted concurrently on max_workers processes. Per series key the cache
+    keeps the chosen order and parameters with the fingerprint of the data they were fitted on:
+    the same data reuses them without fitting, new data warm-starts the previous order
+    from the previous parameters.
+    """
+    def __init__(self, orders=None, criterion='aic', cache_dir=ARIMA_CACHE_DIR, max_workers=1):
+        self.orders = list(orders or candidate_orders())
+        self.criterion = criterion
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _path(self, key):
+        slug = ''.join(ch if ch.isalnum() else '_' for ch in key)
+        return os.path.join(self.cache_dir, f"{slug}.pkl")
+
+    def _load(self, key):
+        path = self._path(key) if self.cache_dir else None
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _save(self, key, entry):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self._path(key) + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path(key))
+
+    def fit(self, values, key, fingerprint):
+        """
+        Best order and parameters for one series. Returns (entry, status) where entry has
+        order / params / aic / bic / candidates and status is 'cached', 'warm' or 'cold'.
+        """
+        values = np.asarray(values, dtype=float)
+        previous = self._load(key)
+        if previous is not None and previous['fingerprint'] == fingerprint:
+            return previous, 'cached'
+
+        # Warm start: the previous winner starts from its previous parameters
+        warm = previous if previous is not None and previous['order'] in self.orders else None
+        starts = [warm['params'] if warm and order == warm['order'] else None for order in self.orders]
+
+        workers = min(self.max_workers, len(self.orders))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(fit_candidate, [values] * len(self.orders), self.orders, starts))
+        else:
+            results = [fit_candidate(values, order, start) for order, start in zip(self.orders, starts)]
+
+        score = 1 if self.criterion == 'aic' else 2
+        best = min(results, key=lambda r: r[score])
+        if best[3] is None:
+            raise ValueError("no ARIMA candidate converged")
+        entry = {
+            'fingerprint': fingerprint,
+            'order': best[0], 'params': best[3], 'aic': best[1], 'bic': best[2],
+            'candidates': {r[0]: r[score] for r in results}
+        }
+        self._save(key, entry)
+        return entry, 'warm' if warm else 'cold'
+
+    def forecast(self, values, entry, steps):
+        return np.asarray(refit(values, entry['order'], entry['params']).forecast(steps=steps))
+
+    def backtest(self, values, entry, test_size=12):
+        """
+        One-step-ahead predictions for the last test_size points from the same ARIMA order,
+        refitted on the training part only and then run over the test weeks without refitting.
+        Returns (actual, predicted).
+        """
+        values = np.asarray(values, dtype=float)
+        train = values[:-test_size]
+        _, _, _, params = fit_candidate(train, entry['order'], start_params=entry['params'])
+        if params is None:
+            raise ValueError(f"ARIMA{entry['order']} did not converge on the training window")
+        pred = refit(values, entry['order'], params).predict(start=len(train), end=len(values) - 1)
+        return values[-test_size:], np.asarray(pred)
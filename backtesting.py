@@ -0,0 +1,181 @@
+import os
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from holt import optimize_holt_batch, holt_forecast_batch
+from direct_forecast import origin_features, direct_training_set, predict_horizons
+
+try:
+    from xgboost import XGBRegressor
+    HAS_XGBOOST = True
+except ImportError:
+    from sklearn.ensemble import GradientBoostingRegressor
+    HAS_XGBOOST = False
+
+# Fitted fold models + predictions, one pickle per fold
+BACKTEST_CACHE_DIR = '.cache/backtests'
+METRIC_COLUMNS = ['mae', 'r_squared', 'directional_acc', 'correlation', 'n_origins']
+
+
+class HoltForecaster:
+    """The tuned Holt model behind the activity/category/entity forecasts (1M pattern, then 6M trend)."""
+    name = 'holt'
+
+    def __init__(self, refine=1):
+        self.refine = refine
+
+    def key(self):
+        return f"holt:refine={self.refine}"
+
+    def fit_predict(self, values, horizon):
+        alphas, betas, _, _ = optimize_holt_batch(values, refine=self.refine)
+        fc = holt_forecast_batch(values, alphas, betas, long_horizon=max(horizon, 4))
+        path = np.concatenate([fc['short'][0], fc['long'][0, fc['short'].shape[1]:]])
+        return (float(alphas[0]), float(betas[0])), path[:horizon]
+
+
+class DirectXGBForecaster:
+    """The direct multi-horizon gradient-boosted forecaster (see direct_forecast.py)."""
+    name = 'xgboost'
+
+    def __init__(self, params=None):
+        self.params = dict(params or {'n_estimators': 100, 'max_depth': 4, 'learning_rate': 0.1})
+
+    def key(self):
+        return f"xgboost:{sorted(self.params.items())}:{HAS_XGBOOST}"
+
+    def fit_predict(self, values, horizon):
+        X, y = direct_training_set(values, horizon=horizon)
+        if HAS_XGBOOST:
+            model = XGBRegressor(**self.params, random_state=42, verbosity=0)
+        else:
+            model = GradientBoostingRegressor(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42)
+        model.fit(X, y)
+        X_origin, origins = origin_features(values)
+        return model, predict_horizons(model, X_origin[-1:], origins[-1:], horizon)[0]
+
+
+def _fold_key(forecaster_key, train, horizon):
+    h = hashlib.sha256()
+    h.update(f"{forecaster_key}|{horizon}|".encode('utf-8'))
+    h.update(np.ascontiguousarray(train, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def _run_folds(forecaster, folds, horizon, cache_dir):
+    """Worker: fit + predict a batch of (fold_id, train values) and cache each fold."""
+    out = {}
+    for fold_id, train in folds:
+        model, pred = forecaster.fit_predict(train, horizon)
+        payload = {'model': model, 'predictions': np.asarray(pred, dtype=float)}
+        if cache_dir:
+            path = os.path.join(cache_dir, f"{_fold_key(forecaster.key(), train, horizon)}.pkl")
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        out[fold_id] = payload['predictions']
+    return out
+
+
+class RollingOriginBacktest:
+    """
+    Walk-forward evaluation: for every series and every origin (training length n), fit on
+    the first n weeks and forecast the next `horizon` weeks. Folds are independent, so
+    uncached ones are spread over max_workers processes. Each fold's fitted model and
+    predictions are cached under a hash of (forecaster, training values, horizon), so a new
+    week only costs the folds whose training window is new.
+    """
+    def __init__(self, forecaster, horizon=12, min_train=52, step=1, cache_dir=BACKTEST_CACHE_DIR, max_workers=1):
+        self.forecaster = forecaster
+        self.horizon = horizon
+        self.min_train = min_train
+        self.step = step
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_hits = 0
+        self.fits = 0
+
+    def origins(self, n):
+        """Training lengths evaluated for a series of n weeks (the latest origin always included)."""
+        last = n - 1
+        return list(range(last, self.min_train - 1, -self.step))[::-1]
+
+    def _cached(self, train):
+        if not self.cache_dir:
+            return None
+        path = os.path.join(self.cache_dir, f"{_fold_key(self.forecaster.key(), train, self.horizon)}.pkl")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)['predictions']
+        except Exception:
+            return None
+
+    def run(self, series_by_name):
+        """Predictions for every fold: one row per (series, origin, horizon) with actual and predicted."""
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        folds, preds = [], {}
+        for name, series in series_by_name.items():
+            values = series.to_numpy(dtype=float)
+            for n in self.origins(len(values)):
+                train = values[:n]
+                cached = self._cached(train)
+                if cached is not None:
+                    preds[(name, n)] = cached
+                else:
+                    folds.append(((name, n), train))
+        self.cache_hits, self.fits = len(preds), len(folds)
+
+        # 1. Fit the uncached folds, in round-robin batches per worker
+        workers = min(self.max_workers, len(folds))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_run_folds, self.forecaster, folds[i::workers], self.horizon, self.cache_dir)
+                           for i in range(workers)]
+                for f in futures:
+                    preds.update(f.result())
+        elif folds:
+            preds.update(_run_folds(self.forecaster, folds, self.horizon, self.cache_dir))
+
+        # 2. Line predictions up with the actuals that were observed later
+        rows = []
+        for name, series in series_by_name.items():
+            values = series.to_numpy(dtype=float)
+            for n in self.origins(len(values)):
+                pred = preds[(name, n)]
+                steps = min(self.horizon, len(values) - n)
+                for h in range(1, steps + 1):
+                    rows.append((name, series.index[n - 1], h, series.index[n + h - 1],
+                                 values[n - 1], values[n + h - 1], pred[h - 1]))
+        return pd.DataFrame(rows, columns=['series', 'origin', 'horizon', 'date', 'last_actual', 'actual', 'predicted'])
+
+
+def backtest_metrics(predictions):
+    """
+    MAE, R², directional accuracy (% of origins where forecast and actual move the same way
+    from the last observed week) and correlation per series and horizon.
+    """
+    def score(group):
+        a, p, last = group['actual'].to_numpy(), group['predicted'].to_numpy(), group['last_actual'].to_numpy()
+        ss_tot = np.sum((a - a.mean()) ** 2)
+        return pd.Series({
+            'mae': np.mean(np.abs(a - p)),
+            'r_squared': 1 - np.sum((a - p) ** 2) / ss_tot if ss_tot > 0 else 0.0,
+            'directional_acc': np.mean(np.sign(a - last) == np.sign(p - last)) * 100,
+            'correlation': np.corrcoef(a, p)[0, 1] if len(a) > 1 and a.std() > 0 and p.std() > 0 else 0.0,
+            'n_origins': len(a)
+        })
+
+    if predictions.empty:
+        index = pd.MultiIndex.from_arrays([[], []], names=['series', 'horizon'])
+        return pd.DataFrame(columns=METRIC_COLUMNS, index=index)
+    report = predictions.groupby(['series', 'horizon'], sort=False)[['actual', 'predicted', 'last_actual']].apply(score)
+    report['n_origins'] = report['n_origins'].astype(int)
+    return report
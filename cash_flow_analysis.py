@@ -12,13 +12,16 @@ import plotly.io as pio # Added for HTML export
 import warnings
 warnings.filterwarnings('ignore')
 import os
+import glob
 import json
+import argparse
+import hashlib
 
 # Advanced forecasting imports
-from statsmodels.tsa.arima.model import ARIMA
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingRandomSearchCV)
+from sklearn.model_selection import HalvingRandomSearchCV
 # XGBoost for 6-month forecasting (ML-based, no TensorFlow needed)
 try:
     from xgboost import XGBRegressor
@@ -37,6 +40,31 @@ except ImportError:
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 
+# Arrow for the partitioned Parquet dataset written by clean_data.py --format parquet
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from date_dimension import build_date_dimension, lookup_calendar
+from cash_flow_cube import CashFlowCube
+from holt import (optimize_holt, optimize_holt_batch, holt_forecast_batch, forecast_series_parallel,
+                  series_seed, DEFAULT_ALPHAS, DEFAULT_BETAS)
+from duplicate_detection import find_duplicate_pairs, duplicate_scores, NEAR_DUPLICATE_THRESHOLD
+from direct_forecast import origin_features, direct_training_set, predict_horizons, feature_names
+from param_store import ParamStore, series_fingerprint
+from backtesting import RollingOriginBacktest, HoltForecaster, DirectXGBForecaster, backtest_metrics
+from panel_model import GlobalPanelForecaster
+from simulation import bootstrap_paths, path_quantiles, DEFAULT_PATHS, INTERVAL_QUANTILES
+from scenarios import ScenarioEngine, default_scenarios, export_scenarios, reconcile_to_total
+from arima_engine import ArimaEngine
+from model_registry import default_registry
+from clean_data import clean_dataset
+from streaming import WeeklyAccumulator
+from pipeline import Pipeline, Stage
+
 warnings.filterwarnings('ignore')
 
 # Set up AZ color scheme
@@ -51,28 +79,115 @@ AZ_COLORS = {
     'gold': '#F0AB00'
 }
 
+# Columns the analysis reads from the cleaned dataset (everything else stays on disk)
+ANALYSIS_COLUMNS = [
+    'Name', 'DocumentNo', 'posting_date', 'week', 'Category', 'Activity', 'Curr.',
+    'Amount in doc. curr.', 'Amount in USD', 'Net_Amount_USD',
+    'cash_flow_direction', 'is_potential_duplicate'
+]
+CATEGORICAL_COLUMNS = ['Name', 'Category', 'Activity', 'Curr.', 'cash_flow_direction']
+
+FORECAST_RESULTS_PATH = 'AstraZeneca_Forecast_Results.csv'
+DASHBOARD_PATH = 'AstraZeneca_Interactive_Insights_CommandCenter.html'
+BACKTEST_RESULTS_PATH = 'AstraZeneca_Backtest_Metrics.csv'
+SCENARIO_RESULTS_PATH = 'AstraZeneca_Scenarios.parquet'
+# Holiday check: 'entity' = each entity against its own market's calendar (default),
+# 'union' = any detected market's holiday counts for every entity (the original behaviour)
+HOLIDAY_SCOPES = {'entity': "the entity's own market calendar", 'union': "any detected market's calendar"}
+
+# main() as a declarative pipeline: each stage names the analyzer attributes it reads and writes.
+# Outputs are cached under .cache/artifacts and reused while a stage's code and inputs are unchanged
+PIPELINE_STAGES = [
+    Stage('load', 'load_data', outputs=['df', 'df_balance', 'df_cat_link', 'df_country'], cache=False),
+    Stage('explore', 'explore_data', inputs=['df']),
+    Stage('preprocess', 'preprocess_data', inputs=['df'],
+          outputs=['df', 'weekly_data', 'date_dim', 'holiday_markets', 'cube']),
+    Stage('forecasts', 'create_forecasts', inputs=['weekly_data', 'cube', 'df_balance'],
+          outputs=['forecasts', 'backtest_results', 'forecast_metrics', 'holt_surfaces'], files=[FORECAST_RESULTS_PATH]),
+    Stage('anomalies', 'detect_anomalies', inputs=['df', 'date_dim', 'holiday_markets'],
+          outputs=['df', 'anomalies', 'anomaly_metrics', 'duplicate_pairs']),
+    Stage('backtests', 'run_backtests', inputs=['cube', 'weekly_data'],
+          outputs=['backtest_predictions', 'backtest_report'], files=[BACKTEST_RESULTS_PATH]),
+    Stage('scenarios', 'run_scenarios', inputs=['cube', 'forecasts'], outputs=['scenario_summary'], files=[SCENARIO_RESULTS_PATH]),
+    Stage('dashboard', 'generate_interactive_dashboard',
+          inputs=['df', 'weekly_data', 'date_dim', 'cube', 'forecasts', 'backtest_results', 'forecast_metrics', 'anomalies'],
+          outputs=['optimization_metrics', 'seasonal_risks', 'verified_dupe_sum', 'verified_dupe_count'], files=[DASHBOARD_PATH]),
+    Stage('insights', 'generate_insights', inputs=['df', 'weekly_data', 'cube', 'anomalies', 'anomaly_metrics']),
+    Stage('questions', 'answer_suggested_questions',
+          inputs=['weekly_data', 'forecasts', 'backtest_results', 'anomalies', 'verified_dupe_sum']),
+]
+
 class CashFlowAnalyzer:
-    def __init__(self, dataset_path):
-        """Initialize the Cash Flow Analyzer with dataset path."""
+    def __init__(self, dataset_path, data=None):
+        """
+        Initialize the Cash Flow Analyzer with dataset path.
+        data: optional cleaned dataset already in memory (DataFrame, pyarrow Table or Arrow IPC handle);
+        when given, load_data uses it instead of the files written by clean_data.py.
+        """
         self.dataset_path = dataset_path
+        self.data = data
         self.df = None
         self.weekly_data = None
         self.forecasts = {}
         self.anomalies = None
+        self.date_dim = None
+        self.holiday_markets = set()
+        self.cube = None
+        self.holt_surfaces = {}
         
-    def load_data(self):
-        """Load the PRE-CLEANED cash flow dataset (CSV)."""
+    def load_data(self, columns=ANALYSIS_COLUMNS, since=None):
+        """
+        Load the PRE-CLEANED cash flow dataset (Parquet partitions or CSV).
+        columns: projection to read (None = every column); since: only postings on/after this date.
+        """
         print("Loading cleaned dataset...")
         try:
-            # Load the CSV generated by clean_data.py
-            schema = {
-                'Amount in USD': float,
-                'Net_Amount_USD': float,
-                'Week_Num': int,
-                'Year': int
-            }
-            # Low_memory=False to handle mixed types if any, though schema helps
-            self.df = pd.read_csv('AstraZeneca_Cleaned_Processed_Data.csv', dtype=schema, parse_dates=['posting_date', 'week'])
+            csv_path = 'AstraZeneca_Cleaned_Processed_Data.csv'
+            part_dir = 'AstraZeneca_Cleaned_Processed_Data'
+            parquet_files = sorted(glob.glob(os.path.join(part_dir, 'Year=*', 'Month=*', 'part-*.parquet')))
+            # Prefer the Parquet dataset unless a flat CSV was exported after it
+            watermark_path = os.path.join(part_dir, '_watermark.json')
+            parquet_is_current = not os.path.exists(csv_path) or (
+                os.path.exists(watermark_path) and os.path.getmtime(watermark_path) >= os.path.getmtime(csv_path)
+            )
+            
+            if self.data is not None:
+                # In-process handoff from clean_data.clean_dataset (no text round trip)
+                print("  • Using in-memory cleaned dataset")
+                self.df = self._frame_from_memory(self.data, columns)
+            elif parquet_files and HAS_PYARROW and parquet_is_current:
+                # Typed output (clean_data.py --format parquet): categoricals + compact dtypes on disk
+                print(f"  • Reading Parquet dataset '{part_dir}/' ({len(parquet_files)} partition files)")
+                self.df = self._read_parquet_dataset(part_dir, parquet_files, columns, since)
+            else:
+                # Load the CSV generated by clean_data.py
+                schema = {
+                    'Amount in USD': float,
+                    'Net_Amount_USD': float,
+                    'Week_Num': int,
+                    'Year': int
+                }
+                read_kwargs = {
+                    'dtype': schema,
+                    'usecols': (lambda c: c in columns) if columns is not None else None,
+                    'parse_dates': [c for c in ['posting_date', 'week'] if columns is None or c in columns]
+                }
+                if not os.path.exists(csv_path) and os.path.isdir(part_dir):
+                    # Incremental cleaner output (clean_data.py --incremental): Year=/Month= partitions
+                    part_files = sorted(glob.glob(os.path.join(part_dir, 'Year=*', 'Month=*', 'part-*.csv')))
+                    print(f"  • Reading {len(part_files)} partition files from '{part_dir}/'")
+                    self.df = pd.concat((pd.read_csv(f, **read_kwargs) for f in part_files), ignore_index=True)
+                else:
+                    # Low_memory=False to handle mixed types if any, though schema helps
+                    self.df = pd.read_csv(csv_path, **read_kwargs)
+            
+            if self.data is not None or not (parquet_files and HAS_PYARROW and parquet_is_current):
+                # Repeated strings -> categoricals (what the Parquet path gets for free)
+                for col in CATEGORICAL_COLUMNS:
+                    if col in self.df.columns and not isinstance(self.df[col].dtype, pd.CategoricalDtype):
+                        self.df[col] = self.df[col].astype('category')
+                if since is not None and 'posting_date' in self.df.columns:
+                    self.df = self.df[self.df['posting_date'] >= pd.Timestamp(since)].reset_index(drop=True)
             
             print(f"Cleaned Dataset loaded. Shape: {self.df.shape}")
             
@@ -98,6 +213,77 @@ class CashFlowAnalyzer:
             print(f"Error loading dataset: {e}")
             return False
     
+    def _frame_from_memory(self, data, columns=None):
+        """
+        Turn an in-memory cleaned dataset into the analysis frame.
+        Accepts a DataFrame, a pyarrow Table/RecordBatchReader, the path of an Arrow IPC file
+        (memory-mapped, so another process's output is read without parsing) or an IPC buffer
+        such as a multiprocessing.shared_memory block.
+        """
+        if isinstance(data, pd.DataFrame):
+            keep = [c for c in data.columns if columns is None or c in columns]
+            return data[keep]
+        
+        if not HAS_PYARROW:
+            raise TypeError("Arrow inputs require 'pyarrow'.")
+        if isinstance(data, (str, os.PathLike)):
+            data = pa.ipc.open_file(pa.memory_map(os.fspath(data), 'r')).read_all()
+        elif isinstance(data, (bytes, bytearray, memoryview, pa.Buffer)):
+            buf = data if isinstance(data, pa.Buffer) else pa.py_buffer(data)
+            # IPC file format starts with the 'ARROW1' magic, anything else is read as a stream
+            is_file = buf.size >= 6 and buf.slice(0, 6).to_pybytes() == b'ARROW1'
+            data = (pa.ipc.open_file(buf) if is_file else pa.ipc.open_stream(buf)).read_all()
+        elif isinstance(data, pa.RecordBatchReader):
+            data = data.read_all()
+        
+        if not isinstance(data, pa.Table):
+            raise TypeError(f"Unsupported dataset type: {type(data).__name__}")
+        if columns is not None:
+            data = data.select([c for c in data.column_names if c in columns])
+        return data.to_pandas()
+    
+    def source_fingerprint(self):
+        """
+        Identity of the cleaned input, used to key the pipeline's artifact cache: a content hash for
+        an in-memory dataset, otherwise path + size + mtime of every file load_data could read.
+        """
+        h = hashlib.sha256()
+        data = self.data
+        if data is None:
+            part_dir = 'AstraZeneca_Cleaned_Processed_Data'
+            paths = ['AstraZeneca_Cleaned_Processed_Data.csv'] + sorted(glob.glob(os.path.join(part_dir, '**', '*'), recursive=True))
+            for path in paths:
+                if os.path.isfile(path):
+                    st = os.stat(path)
+                    h.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode('utf-8'))
+        elif isinstance(data, (str, os.PathLike)):
+            st = os.stat(data)
+            h.update(f"{os.fspath(data)}:{st.st_size}:{st.st_mtime_ns}".encode('utf-8'))
+        elif isinstance(data, pd.DataFrame) or (HAS_PYARROW and isinstance(data, pa.Table)):
+            frame = data if isinstance(data, pd.DataFrame) else data.to_pandas()
+            h.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+        elif isinstance(data, (bytes, bytearray, memoryview)) or (HAS_PYARROW and isinstance(data, pa.Buffer)):
+            h.update(memoryview(data))
+        else:
+            # Streams (RecordBatchReader) cannot be hashed without consuming them: never reuse
+            h.update(os.urandom(16))
+        return h.hexdigest()
+    
+    def _read_parquet_dataset(self, part_dir, files, columns=None, since=None):
+        """Read the Year/Month partitioned Parquet output with column projection and partition pruning."""
+        partitioning = ds.partitioning(pa.schema([('Year', pa.int16()), ('Month', pa.int8())]), flavor='hive')
+        dataset = ds.dataset(files, format='parquet', partitioning=partitioning, partition_base_dir=part_dir)
+        
+        read_cols = [c for c in columns if c in dataset.schema.names] if columns is not None else None
+        row_filter = None
+        if since is not None:
+            since = pd.Timestamp(since)
+            # Partition predicate skips whole Year/Month folders; the date predicate trims the first month
+            in_range = (ds.field('Year') > since.year) | ((ds.field('Year') == since.year) & (ds.field('Month') >= since.month))
+            row_filter = in_range & (ds.field('posting_date') >= since)
+        
+        return dataset.to_table(columns=read_cols, filter=row_filter).to_pandas()
+    
     def explore_data(self):
         """Explore and understand the dataset structure."""
         print("\n=== DATA EXPLORATION ===")
@@ -129,8 +315,14 @@ class CashFlowAnalyzer:
         
         return True
     
-    def preprocess_data(self):
-        """Preprocess data using pre-cleaned attributes (CSV Source)."""
+    def preprocess_data(self, chunk_rows=None):
+        """
+        Preprocess data using pre-cleaned attributes (CSV Source).
+        With chunk_rows set, the weekly aggregation streams the cleaned dataset from disk
+        instead (see preprocess_data_streaming).
+        """
+        if chunk_rows:
+            return self.preprocess_data_streaming(chunk_rows)
         print("\n=== DATA PREPROCESSING (Optimized) ===")
         
         # 1. Verify Activity Column (Crucial for Theory)
@@ -140,9 +332,11 @@ class CashFlowAnalyzer:
              print("  • Warning: 'Activity' column missing. Check clean_data.py.")
 
         # 2. Date/Time checks
+        # Calendar attributes are computed once per day in the shared date dimension
+        self._build_date_dimension()
         # 'month' might be missing if only 'week' was in CSV or not parsed as date
         if 'month' not in self.df.columns and 'posting_date' in self.df.columns:
-            self.df['month'] = self.df['posting_date'].dt.to_period('M').dt.start_time
+            self.df['month'] = self._calendar(self.df['posting_date'], ['month_start'])['month_start']
             
         # 3. Aggregation (Weekly)
         # We group by Week, Category, Activity to maintain granularity for Forecasts
@@ -160,16 +354,16 @@ class CashFlowAnalyzer:
         else:
              print("  • Note: Net_Amount_USD not found, using Amount in USD.")
         
-        # Aggregation Dictionary
-        agg_dict = {
-            val_col: 'sum',
-        }
+        # One scan of the transactions into the cash-flow cube; every later roll-up
+        # (weekly totals, per entity / category / month, ...) is answered from it
+        self.cube = CashFlowCube.from_transactions(self.df, self.date_dim, value_col=val_col)
+        print(f"  • Cash-flow cube built: {len(self.cube.cells)} cells over {self.cube.dims}")
         
-        self.weekly_data = self.df.groupby(group_cols).agg(agg_dict).reset_index()
+        self.weekly_data = self.cube.series(tuple(group_cols)).reset_index()
         
         # Rename for internal consistency with Forecast engine
         self.weekly_data = self.weekly_data.rename(columns={
-            val_col: 'weekly_amount_usd'
+            'net': 'weekly_amount_usd'
         })
         
         # Sort
@@ -178,6 +372,85 @@ class CashFlowAnalyzer:
         print(f"Weekly data aggregated. Records: {len(self.weekly_data)}")
         return True
 
+    def preprocess_data_streaming(self, chunk_rows):
+        """
+        Out-of-core weekly aggregation: read the cleaned dataset in chunks of chunk_rows and
+        fold each into running (week, Category, Activity) sums. self.df is never loaded,
+        so peak memory is set by the chunk size, not by the ledger size.
+        """
+        print(f"\n=== DATA PREPROCESSING (Streaming, {chunk_rows} rows per chunk) ===")
+        weekly = None
+        for chunk in self._iter_dataset_chunks(['week', 'Category', 'Activity', 'Net_Amount_USD', 'Amount in USD'], chunk_rows):
+            if weekly is None:
+                val_col = 'Net_Amount_USD' if 'Net_Amount_USD' in chunk.columns else 'Amount in USD'
+                group_cols = [c for c in ['week', 'Category', 'Activity'] if c in chunk.columns]
+                weekly = WeeklyAccumulator(group_cols, val_col)
+            weekly.add(chunk)
+        
+        if weekly is None:
+            print("  • Warning: cleaned dataset is empty.")
+            return False
+        self.weekly_data = weekly.result(categorical=['Category', 'Activity']).rename(columns={
+            weekly.value_col: 'weekly_amount_usd'
+        })
+        self.cube = CashFlowCube.from_weekly(self.weekly_data)
+        print(f"Weekly data aggregated from {weekly.n_rows} rows. Records: {len(self.weekly_data)}")
+        return True
+    
+    def _iter_dataset_chunks(self, columns, chunk_rows):
+        """Yield the cleaned dataset (Parquet partitions, CSV partitions or flat CSV) in bounded chunks."""
+        csv_path = 'AstraZeneca_Cleaned_Processed_Data.csv'
+        part_dir = 'AstraZeneca_Cleaned_Processed_Data'
+        parquet_files = sorted(glob.glob(os.path.join(part_dir, 'Year=*', 'Month=*', 'part-*.parquet')))
+        watermark_path = os.path.join(part_dir, '_watermark.json')
+        parquet_is_current = not os.path.exists(csv_path) or (
+            os.path.exists(watermark_path) and os.path.getmtime(watermark_path) >= os.path.getmtime(csv_path)
+        )
+        
+        if parquet_files and HAS_PYARROW and parquet_is_current:
+            dataset = ds.dataset(parquet_files, format='parquet')
+            read_cols = [c for c in columns if c in dataset.schema.names]
+            for batch in dataset.to_batches(columns=read_cols, batch_size=chunk_rows):
+                yield batch.to_pandas()
+            return
+        
+        if not os.path.exists(csv_path) and os.path.isdir(part_dir):
+            files = sorted(glob.glob(os.path.join(part_dir, 'Year=*', 'Month=*', 'part-*.csv')))
+        else:
+            files = [csv_path]
+        for path in files:
+            header = pd.read_csv(path, nrows=0).columns
+            read_cols = [c for c in columns if c in header]
+            yield from pd.read_csv(path, usecols=read_cols, parse_dates=['week'] if 'week' in read_cols else None,
+                                   chunksize=chunk_rows)
+    
+    def _detect_holiday_markets(self):
+        """Guess holiday markets from entity codes (e.g., TW10 -> TW), defaulting to US/GB."""
+        countries_found = set()
+        if HAS_HOLIDAYS and 'Name' in self.df.columns:
+            # Assuming Name contains code like 'TW10', 'US01' etc.
+            # Extract first 2 letters
+            supported = holidays.list_supported_countries()
+            potential_codes = self.df['Name'].dropna().astype(str).str[:2].unique()
+            countries_found = {code for code in potential_codes if code in supported}
+        return countries_found
+
+    def _build_date_dimension(self):
+        """Build the shared date dimension (one row per day) over all posting dates."""
+        if 'posting_date' not in self.df.columns:
+            return None
+        self.holiday_markets = self._detect_holiday_markets()
+        countries = (self.holiday_markets or {'US', 'GB'}) if HAS_HOLIDAYS else None
+        self.date_dim = build_date_dimension(self.df['posting_date'], countries=countries)
+        print(f"  • Date dimension built: {len(self.date_dim)} days")
+        return self.date_dim
+
+    def _calendar(self, dates, columns):
+        """Calendar attributes for a date column, joined from the date dimension by date key."""
+        if self.date_dim is None:
+            self._build_date_dimension()
+        return lookup_calendar(self.date_dim, dates, columns)
+
     def preprocess_data_deprecated(self):
         """Preprocess data for analysis using Pandas."""
         print("\n=== DATA PREPROCESSING ===")
@@ -249,7 +522,7 @@ class CashFlowAnalyzer:
         if 'DocumentNo' in self.df.columns:
             agg_dict['DocumentNo'] = 'count'
         
-        self.weekly_data = self.df.groupby(group_cols).agg(agg_dict).reset_index()
+        self.weekly_data = self.df.groupby(group_cols, observed=True).agg(agg_dict).reset_index()
         
         # Rename columns for clarity
         self.weekly_data = self.weekly_data.rename(columns={
@@ -295,132 +568,193 @@ class CashFlowAnalyzer:
                 'rmse': 0
             }
 
-        # Calculate trend using linear regression on recent data
-        recent_weeks = min(12, len(series))
-        
-        
-        # Optimize parameters (Cleaned up duplications)
-        alpha, beta = self._optimize_holt_parameters(series)
-        
-        try:
-            level = series.iloc[0]
-        except IndexError:
-            print(f"\nCRITICAL ERROR in _generate_forecast_model for '{name}':")
-            print(f"  Type: {type(series)}")
-            print(f"  Shape: {series.shape}")
-            print(f"  Empty: {series.empty}")
-            print(f"  Head: {series.head()}")
-            # Return empty to avoid crash
-            return {
+        return self._generate_forecast_models({name: series})[name]
+
+    def forecast_global_panel(self, weeks=None, steps=24):
+        """
+        Train one gradient-boosted model on the whole Name x Category x Activity panel
+        (see panel_model.py) and forecast every series with a single predict call.
+        Returns the leaf forecasts ('series', one row per combination) and their
+        roll-ups per hierarchy level ('rollups').
+        """
+        dims = [d for d in ['Name', 'Category', 'Activity'] if d in self.cube.dims]
+        if not dims:
+            return {}
+        print("Training global panel model across all ledger series...")
+        panel = self.cube.series(tuple(['week'] + dims)).unstack(dims, fill_value=0)
+        if weeks is not None:
+            panel = panel.reindex(weeks, fill_value=0)
+        model = GlobalPanelForecaster(horizon=steps).fit(panel)
+        fc = model.predict()
+        print(f"  • 1 model, {model.n_train_rows:,} training rows, {len(fc)} series forecast in one batch")
+        
+        rollups = {dim: fc.groupby(level=dim, observed=True).sum() for dim in dims} if isinstance(fc.index, pd.MultiIndex) \
+            else {dims[0]: fc}
+        return {'series': fc, 'rollups': rollups}
+
+    def _add_prediction_intervals(self, n_paths=DEFAULT_PATHS):
+        """
+        P5/P50/P95 bands for the 6M forecasts from bootstrapped residuals: every series'
+        paths are drawn in one (series x paths x weeks) array (see simulation.py).
+        Total uses the one-step errors of its backtest, the Holt series their in-sample
+        one-step errors. Adds model['intervals'] and, from the total's cumulative paths,
+        self.forecasts['balance']['intervals']. Ledger series get (series x weeks) bands in
+        self.forecasts['ledger']['intervals'].
+        """
+        models = []
+        total = self.forecasts.get('total')
+        has_total = total is not None and not total['6month'].empty
+        if has_total:
+            bt = self.backtest_results.get('by_series', {}).get('total') or self.backtest_results.get('xgboost')
+            residuals = (bt['actual'] - bt['predicted']).to_numpy() if bt else np.array([])
+            models.append((total, total['6month'], residuals))
+        for group in ['activities', 'categories', 'entities']:
+            for model in self.forecasts.get(group, {}).values():
+                if '6month_base' in model:
+                    models.append((model, model['6month_base'], model['residuals']))
+        if models:
+            # All series share the forecast weeks (reindexed to the total)
+            index = models[0][1].index
+            base = np.vstack([b.reindex(index).to_numpy(dtype=float) for _, b, _ in models])
+            paths = bootstrap_paths(base, [r for _, _, r in models], n_paths=n_paths)
+            for (model, _, _), bands in zip(models, path_quantiles(paths, index)):
+                model['intervals'] = bands
+            
+            # Balance band from the total's paths (row 0 only when the total was added)
+            if has_total and 'balance' in self.forecasts:
+                start = self.forecasts['balance'].get('last_actual', 0)
+                self.forecasts['balance']['intervals'] = path_quantiles(paths[:1], index, cumulative=True, start=start)[0]
+            print(f"  • Monte Carlo intervals: {paths.shape[0]} series x {paths.shape[1]:,} paths x {paths.shape[2]} weeks (P5/P50/P95)")
+        
+        ledger = self.forecasts.get('ledger')
+        if ledger and '6month_base' in ledger:
+            ledger['intervals'] = self._ledger_intervals(ledger, n_paths)
+            print(f"  • Monte Carlo intervals: {len(ledger['6month_base'])} ledger series (P5/P50/P95)")
+
+    def _ledger_intervals(self, ledger, n_paths=DEFAULT_PATHS, chunk=64):
+        """
+        P5/P50/P95 of every ledger series as {'p5': DataFrame(series x weeks), ...}. Series are
+        simulated `chunk` at a time (own seed per chunk) so the path array stays bounded.
+        """
+        base = ledger['6month_base']
+        values, residuals = base.to_numpy(dtype=float), ledger['residuals']
+        bands = []
+        for k, start in enumerate(range(0, len(values), chunk)):
+            rows = slice(start, start + chunk)
+            paths = bootstrap_paths(values[rows], list(residuals[rows]), n_paths=n_paths, seed=42 + k)
+            bands.append(np.percentile(paths, INTERVAL_QUANTILES, axis=1))
+        q = np.concatenate(bands, axis=1) if bands else np.empty((len(INTERVAL_QUANTILES), 0, base.shape[1]))
+        return {f"p{int(x)}": pd.DataFrame(q[i], index=base.index, columns=base.columns)
+                for i, x in enumerate(INTERVAL_QUANTILES)}
+
+    def _generate_forecast_models(self, series_by_name, seeds=None, max_workers=1):
+        """
+        Forecast many weekly series in one pass. The series share one week index (reindexed
+        to the total), so they are stacked into a (series x weeks) matrix: parameters are
+        tuned per row and level/trend for every row step forward together (see holt.py).
+        With seeds (one per series) each series gets its own noise stream and the rows are
+        sharded across max_workers processes.
+        Returns {name: forecast dict}, the same dict _generate_forecast_model returns.
+        """
+        names = list(series_by_name)
+        if not names:
+            return {}
+        frame = pd.concat([series_by_name[n] for n in names], axis=1, keys=range(len(names)))
+        matrix = frame.to_numpy(dtype=float).T
+
+        # 1. Per-series (alpha, beta) from one grid search over the whole matrix
+        if seeds is not None:
+            alphas, betas, surfaces, fc = forecast_series_parallel(matrix, seeds, max_workers=max_workers)
+        else:
+            alphas, betas, _, surfaces = optimize_holt_batch(matrix, refine=1)
+            fc = holt_forecast_batch(matrix, alphas, betas)
+        for i, name in enumerate(names):
+            if not np.isnan(surfaces[i]).all():
+                self.holt_surfaces[name] = pd.DataFrame(surfaces[i], index=pd.Index(DEFAULT_ALPHAS, name='alpha'),
+                                                        columns=pd.Index(DEFAULT_BETAS, name='beta'))
+
+        # 2. Fitted levels + 1M (recent change pattern) / 6M (damped trend + noise) forecasts
+        last_date = frame.index[-1]
+        dates_1m = pd.date_range(start=last_date + timedelta(days=1), periods=4, freq='W-MON')
+        dates_6m = pd.date_range(start=last_date + timedelta(days=1), periods=24, freq='W-MON')
+
+        models = {}
+        for i, name in enumerate(names):
+            series = series_by_name[name]
+            models[name] = {
                 'name': name,
-                '1month': pd.Series([], dtype=float),
-                '6month': pd.Series([], dtype=float),
+                '1month': pd.Series(fc['short'][i], index=dates_1m),
+                '6month': pd.Series(fc['long'][i], index=dates_6m),
                 'historical': series,
-                'es_values': pd.Series([], dtype=float),
-                'trend': 0, 'mae': 0, 'rmse': 0
+                'es_values': pd.Series(fc['fitted'][i], index=series.index),
+                'trend': fc['trend'][i],
+                'mae': fc['mae'][i],
+                'rmse': fc['rmse'][i],
+                # For the prediction intervals: noise-free 6M path and one-step errors
+                '6month_base': pd.Series(fc['long_mean'][i], index=dates_6m),
+                'residuals': fc['residuals'][i]
             }
-            
-        trend = 0
-        
-        es_values = []
-        
-        for value in series.values:
-            new_level = alpha * value + (1 - alpha) * (level + trend)
-            new_trend = beta * (new_level - level) + (1 - beta) * trend
-            es_values.append(new_level)
-            level = new_level
-            trend = new_trend
-            
-        last_date = series.index[-1]
-        last_level = level
-        last_trend = trend
-        
-        # Get actual historical changes to use as pattern (last 8 weeks)
-        recent_changes = series.diff().dropna().tail(8).values.tolist()
-        if len(recent_changes) < 2:
-            recent_changes = [0, 0]  # Fallback
-        
-        # 1-month forecast (4 weeks) - Use actual historical change pattern
-        forecast_1month_dates = pd.date_range(start=last_date + timedelta(days=1), periods=4, freq='W-MON')
-        forecast_1month_values = []
-        current_level = last_level
-        
-        for i in range(4):
-            # Apply actual historical change pattern (cycling through recent changes)
-            change_idx = i % len(recent_changes)
-            current_level = current_level + recent_changes[change_idx]
-            forecast_1month_values.append(current_level)
-            
-        forecast_1month = pd.Series(forecast_1month_values, index=forecast_1month_dates)
-        
-        # 6-month forecast (24 weeks) - Trend + realistic noise from historical volatility
-        forecast_6month_dates = pd.date_range(start=last_date + timedelta(days=1), periods=24, freq='W-MON')
-        forecast_6month_values = []
-        
-        # Use historical volatility for natural variation (seeded for reproducibility)
-        np.random.seed(42)  # Fixed seed = same forecast each run
-        historical_std = series.std() if len(series) > 1 else abs(last_level) * 0.1
-        
-        current_level = last_level
-        for i in range(24):
-            # Apply damped trend
-            damped_trend = last_trend * (0.97 ** i)
-            current_level = current_level + damped_trend
-            # Add realistic noise (matching historical amplitude)
-            noise = np.random.normal(0, historical_std * 0.6)
-            forecast_6month_values.append(current_level + noise)
-            
-        forecast_6month = pd.Series(forecast_6month_values, index=forecast_6month_dates)
-
-
-
-
-
-
-        
-        # Accuracy metrics
-        mae, rmse = 0, 0
-        if len(series) > 8:
-            test_actual = series.iloc[-8:]
-            # Simple moving average as baseline for error calculation
-            ma_baseline = series.rolling(window=4).mean().shift(1)
-            test_forecast = ma_baseline.iloc[-8:]
-            
-            # Align
-            common_idx = test_actual.index.intersection(test_forecast.index)
-            if len(common_idx) > 0:
-                a, b = test_actual[common_idx].values, test_forecast[common_idx].values
-                mae = np.mean(np.abs(a - b))
-                rmse = np.sqrt(np.mean((a - b)**2))
+        return models
 
+    def forecast_ledger_series(self, weeks=None):
+        """
+        Holt forecasts for every Name x Category x Activity series in the ledger at once.
+        Returns matrices (one row per series): 'fitted' over the weeks, '1month' / '6month'
+        over the forecast dates, the noise-free '6month_base' with its one-step 'residuals'
+        (for intervals), plus the tuned 'alpha' / 'beta' per series.
+        """
+        dims = [d for d in ['Name', 'Category', 'Activity'] if d in self.cube.dims]
+        if not dims:
+            return {}
+        panel = self.cube.series(tuple(['week'] + dims)).unstack(dims, fill_value=0)
+        if weeks is not None:
+            panel = panel.reindex(weeks, fill_value=0)
+        matrix = panel.to_numpy(dtype=float).T
+        alphas, betas, _, _ = optimize_holt_batch(matrix, refine=1)
+        fc = holt_forecast_batch(matrix, alphas, betas)
+
+        last_date = panel.index[-1]
+        keys = panel.columns
         return {
-            'name': name,
-            '1month': forecast_1month,
-            '6month': forecast_6month,
-            'historical': series,
-            'es_values': pd.Series(es_values, index=series.index),
-            'trend': last_trend,
-            'mae': mae,
-            'rmse': rmse
+            'fitted': pd.DataFrame(fc['fitted'], index=keys, columns=panel.index),
+            '1month': pd.DataFrame(fc['short'], index=keys,
+                                   columns=pd.date_range(start=last_date + timedelta(days=1), periods=4, freq='W-MON')),
+            '6month': pd.DataFrame(fc['long'], index=keys,
+                                   columns=pd.date_range(start=last_date + timedelta(days=1), periods=24, freq='W-MON')),
+            '6month_base': pd.DataFrame(fc['long_mean'], index=keys,
+                                        columns=pd.date_range(start=last_date + timedelta(days=1), periods=24, freq='W-MON')),
+            'residuals': fc['residuals'],
+            'alpha': pd.Series(alphas, index=keys),
+            'beta': pd.Series(betas, index=keys)
         }
 
-    def create_forecasts(self):
-        """Create time series forecasts using ARIMA (1M) and LSTM (6M)."""
+    def create_forecasts(self, all_series=False, max_workers=1, retune=False, global_model=False, arima_benchmark=False):
+        """
+        Create time series forecasts using ARIMA (1M) and LSTM (6M).
+        all_series=True forecasts every category and entity (not just the top drivers),
+        sharded across max_workers processes with one seeded noise stream per series, and
+        every Name x Category x Activity ledger series in one batch (forecasts['ledger']).
+        arima_benchmark=True adds the auto-order ARIMA 1M benchmark for the total.
+        retune=True re-runs the XGBoost hyperparameter search even if stored parameters are current.
+        global_model=True also trains one panel model over every ledger series (forecasts['panel']).
+        """
         print("\n=== TIME SERIES FORECASTING (ARIMA + LSTM) ===")
         
         # Initialize backtest results storage
         self.backtest_results = {}
         self.forecast_metrics = {}
+        self.param_store = ParamStore()
+        self.retune = retune
         
         # 1. Total Cash Flow Forecast
         # 1. Total Cash Flow Forecast - UNIFIED & REFINED
-        weekly_totals = self.weekly_data.groupby('week')['weekly_amount_usd'].sum()
+        weekly_totals = self.cube.series('week')
         print("Generating forecasts for Total Net Cash Flow...")
         
         # Unified 24-week forecast (covers both 1M and 6M horizons)
         # Using refine=True to enable Hyperparameter Tuning
         print("  [Unified] Generating 24-week Forecast with Hyperparameter Tuning & Seasonality...")
-        fc_unified, mae_model, r2_model = self._generate_xgboost_forecast(weekly_totals, steps=24, refine=True)
+        fc_unified, mae_model, r2_model = self._generate_xgboost_forecast(weekly_totals, steps=24, refine=True, series_key='total')
         
         # Split horizons
         fc_1m = fc_unified.head(4)
@@ -452,6 +786,14 @@ class CashFlowAnalyzer:
         self.forecast_metrics['1m_r2'] = r2_model
         self.forecast_metrics['6m_r2'] = r2_model
         
+        # ARIMA benchmark for the 1M horizon (auto-selected order, opt-in: 18 candidate fits)
+        if arima_benchmark:
+            print("  [Benchmark] ARIMA 1-month forecast...")
+            fc_arima, mae_arima, r2_arima = self._generate_arima_forecast(weekly_totals, steps=4, max_workers=max_workers)
+            self.forecasts['total']['arima_1month'] = fc_arima
+            self.forecast_metrics['arima_mae'] = mae_arima
+            self.forecast_metrics['arima_r2'] = r2_arima
+        
         # Backward compatibility
         self.forecasts['historical'] = weekly_totals
         self.forecasts['1month'] = fc_1m
@@ -463,16 +805,16 @@ class CashFlowAnalyzer:
         self.forecasts['activities'] = {}
         if 'Activity' in self.weekly_data.columns:
             activities = self.weekly_data['Activity'].unique()
+            act_series = {}
             for act in activities:
                 # Need to handle NaN activity
                 if pd.isna(act): continue
                 
                 print(f"  - Forecasting for: {act}")
-                act_data = self.weekly_data[self.weekly_data['Activity'] == act]
-                act_weekly = act_data.groupby('week')['weekly_amount_usd'].sum()
-                act_weekly = act_weekly.reindex(weekly_totals.index, fill_value=0)
-                
-                self.forecasts['activities'][str(act)] = self._generate_forecast_model(act_weekly, str(act))
+                act_weekly = self.cube.series('week', where={'Activity': act})
+                act_series[str(act)] = act_weekly.reindex(weekly_totals.index, fill_value=0)
+            
+            self.forecasts['activities'] = self._generate_forecast_models(act_series)
                 
         # 3. Forecast Ending Cash Balance
         # We need the LAST ACTUAL closing balance from self.df_balance
@@ -509,49 +851,81 @@ class CashFlowAnalyzer:
         print("  - Generated Relative Liquidity Projection (Cumulative Flow)")
 
         # 4. Category Forecasts (Top Drivers)
-        print("Generating forecasts for Top Categories...")
         self.forecasts['categories'] = {}
         
         if 'Category' in self.weekly_data.columns:
-            # Identify top 2 categories by volume
-            cat_volumes = self.weekly_data.groupby('Category')['weekly_amount_usd'].apply(lambda x: x.abs().sum())
-            top_categories = cat_volumes.nlargest(2).index.tolist()
-            
-            for cat in top_categories:
-                print(f"  - Forecasting for Category: {cat}")
-                cat_data = self.weekly_data[self.weekly_data['Category'] == cat]
-                cat_weekly = cat_data.groupby('week')['weekly_amount_usd'].sum()
-                # Reindex
-                cat_weekly = cat_weekly.reindex(weekly_totals.index, fill_value=0)
+            # Categories by volume, largest first
+            cat_volumes = self.weekly_data.groupby('Category', observed=True)['weekly_amount_usd'].apply(lambda x: x.abs().sum())
+            
+            if all_series:
+                print(f"Generating forecasts for all {len(cat_volumes)} Categories...")
+                ranked = cat_volumes.sort_values(ascending=False).index
+                panel = self.cube.series(('week', 'Category')).unstack('Category', fill_value=0)
+                panel = panel.reindex(index=weekly_totals.index, columns=ranked, fill_value=0)
+                cat_series = {cat: panel[cat] for cat in ranked}
+                seeds = [series_seed(f"Category:{cat}") for cat in ranked]
+                self.forecasts['categories'] = self._generate_forecast_models(cat_series, seeds, max_workers)
+                print(f"  • {len(cat_series)} category forecasts")
+            else:
+                print("Generating forecasts for Top Categories...")
+                # Identify top 2 categories by volume
+                top_categories = cat_volumes.nlargest(2).index.tolist()
                 
-                self.forecasts['categories'][cat] = self._generate_forecast_model(cat_weekly, cat)
+                cat_series = {}
+                for cat in top_categories:
+                    print(f"  - Forecasting for Category: {cat}")
+                    cat_weekly = self.cube.series('week', where={'Category': cat})
+                    # Reindex
+                    cat_series[cat] = cat_weekly.reindex(weekly_totals.index, fill_value=0)
+                
+                self.forecasts['categories'] = self._generate_forecast_models(cat_series)
 
         # 5. Entity Forecasts (Top Spenders) - [NEW] Extracting More Value
-        print("Generating forecasts for Top Entities...")
         self.forecasts['entities'] = {}
         
-        if 'Name' in self.df.columns:
-            # Aggregate weekly by Name
-            # We need to rebuild weekly agg for Name since self.weekly_data might not have it grouped
-            # Let's check self.weekly_data or go back to self.df
-            # self.weekly_data grouped by [week, Category, Activity]. Name is lost.
-            # Go back to self.df
-            
-            # Top 5 Spenders (Outflow)
-            outflows = self.df[self.df['Amount in USD'] < 0]
-            top_entities = outflows.groupby('Name')['Amount in USD'].sum().abs().nlargest(5).index.tolist()
-            
-            for ent in top_entities:
-                print(f"  - Forecasting for Entity: {ent}")
-                # Filter and Agg
-                ent_data = self.df[self.df['Name'] == ent]
-                if 'week' not in ent_data.columns:
-                     ent_data['week'] = pd.to_datetime(ent_data['posting_date']).dt.to_period('W').dt.start_time
+        if 'Name' in self.cube.dims:
+            # self.weekly_data grouped by [week, Category, Activity]. Name is lost,
+            # the cube keeps it (gross 'Amount in USD' measures)
+            if all_series:
+                # Every entity, top spenders first (the dashboard shows the first 5)
+                names = self.cube.rollup('Name')
+                ranked = names.assign(spend=-names['gross_outflow_usd'], volume=names['gross_usd'].abs()) \
+                              .sort_values(['spend', 'volume'], ascending=False).index
+                print(f"Generating forecasts for all {len(ranked)} Entities...")
+                panel = self.cube.series(('week', 'Name'), 'gross_usd').unstack('Name', fill_value=0)
+                panel = panel.reindex(index=weekly_totals.index, columns=ranked, fill_value=0)
+                ent_series = {ent: panel[ent] for ent in ranked}
+                seeds = [series_seed(f"Entity:{ent}") for ent in ranked]
+                self.forecasts['entities'] = self._generate_forecast_models(ent_series, seeds, max_workers)
+                print(f"  • {len(ent_series)} entity forecasts")
+            else:
+                print("Generating forecasts for Top Entities...")
+                # Top 5 Spenders (Outflow)
+                outflows = self.cube.series('Name', 'gross_outflow_usd')
+                top_entities = outflows[outflows < 0].abs().nlargest(5).index.tolist()
                 
-                ent_weekly = ent_data.groupby('week')['Amount in USD'].sum()
-                ent_weekly = ent_weekly.sort_index().reindex(weekly_totals.index, fill_value=0)
+                ent_series = {}
+                for ent in top_entities:
+                    print(f"  - Forecasting for Entity: {ent}")
+                    ent_weekly = self.cube.series('week', 'gross_usd', where={'Name': ent})
+                    ent_series[ent] = ent_weekly.sort_index().reindex(weekly_totals.index, fill_value=0)
                 
-                self.forecasts['entities'][ent] = self._generate_forecast_model(ent_weekly, ent)
+                self.forecasts['entities'] = self._generate_forecast_models(ent_series)
+        
+        # 6. Every ledger series (entity x category x activity) in one batch, with all_series
+        ledger = self.forecast_ledger_series(weeks=weekly_totals.index) if all_series else {}
+        if ledger:
+            self.forecasts['ledger'] = ledger
+            print(f"  • Ledger series forecast in one batch: {len(ledger['alpha'])} series x {ledger['fitted'].shape[1]} weeks")
+        
+        # 7. Monte Carlo prediction intervals for every forecast above
+        self._add_prediction_intervals()
+        
+        # 8. Global panel model: one model for every ledger series
+        if global_model:
+            panel = self.forecast_global_panel(weeks=weekly_totals.index)
+            if panel:
+                self.forecasts['panel'] = panel
 
         # 5. EXPORT FORECAST DATA (ESS Ready)
         print("Exporting Forecast Results to CSV...")
@@ -595,10 +969,21 @@ class CashFlowAnalyzer:
         if 'categories' in self.forecasts:
             for cat_name, model in self.forecasts['categories'].items():
                 unpack_forecast(model, f"Category: {cat_name}")
+        
+        # Unpack Entities
+        if 'entities' in self.forecasts:
+            for ent_name, model in self.forecasts['entities'].items():
+                unpack_forecast(model, f"Entity: {ent_name}")
+                
+        # Unpack Global Panel roll-ups
+        if 'panel' in self.forecasts:
+            for dim, table in self.forecasts['panel']['rollups'].items():
+                for value, row in table.iterrows():
+                    unpack_forecast({'name': value, '1month': row.iloc[:4], '6month': row}, f"Panel {dim}: {value}")
                 
         # Save to CSV
         if forecast_rows:
-            pd.DataFrame(forecast_rows).to_csv('AstraZeneca_Forecast_Results.csv', index=False)
+            pd.DataFrame(forecast_rows).to_csv(FORECAST_RESULTS_PATH, index=False)
             print(f"  • Forecasts exported: {len(forecast_rows)} rows")
                 
         return True
@@ -738,92 +1123,58 @@ class CashFlowAnalyzer:
         return True
 
     
-    def _optimize_holt_parameters(self, series):
+    def _optimize_holt_parameters(self, series, name=None):
         """
         Grid search to find optimal alpha (level) and beta (trend) parameters.
-        Returns best params and the associated error.
+        The whole grid runs as one array recursion (see holt.py); the validation error
+        surface is kept in self.holt_surfaces[name] for diagnostics.
         """
-        best_alpha, best_beta = 0.3, 0.2
-        best_rmse = float('inf')
-        
-        # Grid search range
-        alphas = [0.1, 0.3, 0.5, 0.7, 0.9]
-        betas = [0.1, 0.2, 0.3, 0.4]
-        
-        # Split for validation (last 4 weeks as validation set)
-        if len(series) < 8:
-            return best_alpha, best_beta
-            
-        train = series.iloc[:-4]
-        valid = series.iloc[-4:]
-        
-        if train.empty:
-            return best_alpha, best_beta
-            
-        try:
-           # Dry run to check index access
-           _ = train.iloc[0]
-        except:
-           return best_alpha, best_beta
-        
-        for a in alphas:
-            for b in betas:
-                # Run Holt's on train
-                level = train.iloc[0]
-                trend = 0
-                preds = []
-                
-                # Fit
-                for val in train.values:
-                    last_level = level
-                    level = a * val + (1 - a) * (last_level + trend)
-                    trend = b * (level - last_level) + (1 - b) * trend
-                
-                # Forecast
-                last_level = level
-                last_trend = trend
-                for i in range(4):
-                     preds.append(last_level + (i+1)*last_trend)
-                
-                # Evaluate
-                try:
-                    diff = valid.values - preds
-                    rmse = np.sqrt(np.mean(diff**2))
-                    if rmse < best_rmse:
-                        best_rmse = rmse
-                        best_alpha = a
-                        best_beta = b
-                except:
-                    continue
-                    
-        return best_alpha, best_beta
+        alpha, beta, rmse, surface = optimize_holt(series.values, refine=1)
+        if name is not None and not surface.empty:
+            self.holt_surfaces[name] = surface
+        return alpha, beta
 
-    def _generate_arima_forecast(self, series, steps=4):
+    def _generate_arima_forecast(self, series, steps=4, series_key='total', max_workers=1):
         """
         Generate 1-month (4-week) forecast using ARIMA model.
-        ARIMA is optimal for short-term: captures linear patterns, interpretable, fast.
+        The (p,d,q) order is chosen by AIC over a bounded grid, candidates fitted in parallel
+        (see arima_engine.py); fits are cached per series and warm-started on new data.
+        The backtest uses the same ARIMA order (one-step-ahead over the last 12 weeks).
+        Returns (forecast, MAE, R²).
         """
         if series.empty or len(series) < 10:
             return pd.Series(dtype=float), 0, 0
         
         try:
-            # Fit ARIMA(2,1,2) - common for financial time series
-            model = ARIMA(series.values, order=(2, 1, 2))
-            fitted = model.fit()
+            engine = ArimaEngine(max_workers=max_workers)
+            entry, status = engine.fit(series.values, f"arima:{series_key}", series_fingerprint(series))
+            order = entry['order']
             
             # Forecast
-            forecast = fitted.forecast(steps=steps)
+            forecast = engine.forecast(series.values, entry, steps)
             
             # Create date index for forecasts
             last_date = series.index[-1]
             forecast_dates = pd.date_range(start=last_date + timedelta(days=1), periods=steps, freq='W-MON')
             forecast_series = pd.Series(forecast, index=forecast_dates)
             
-            # Calculate accuracy metrics via backtest
-            mae, mape = self._calculate_backtest_accuracy(series, model_type='arima')
-            
-            print(f"  ✓ ARIMA(2,1,2) fitted. MAE: ${mae/1e6:.2f}M, MAPE: {mape:.1f}%")
-            return forecast_series, mae, mape
+            # Accuracy from a backtest of the same model family
+            mae, r_squared = 0, 0
+            if len(series) >= 24:
+                actual, predicted = engine.backtest(series.values, entry)
+                mae = np.mean(np.abs(actual - predicted))
+                ss_tot = np.sum((actual - actual.mean()) ** 2)
+                r_squared = max(0, 1 - np.sum((actual - predicted) ** 2) / ss_tot) if ss_tot > 0 else 0
+                self.backtest_results.setdefault('by_series', {})[f"arima:{series_key}"] = {
+                    'actual': series.iloc[-len(actual):],
+                    'predicted': pd.Series(predicted, index=series.index[-len(actual):]),
+                    'dates': series.index[-len(actual):],
+                    'r_squared': r_squared
+                }
+            
+            print(f"  ✓ ARIMA{order} selected by AIC ({status}, {len(entry['candidates'])} candidates). "
+                  f"Backtest MAE: ${mae/1e6:.2f}M, R²: {r_squared:.2f}")
+            return forecast_series, mae, r_squared
             
         except Exception as e:
             print(f"  ⚠ ARIMA failed ({e}), using fallback...")
@@ -832,34 +1183,21 @@ class CashFlowAnalyzer:
             forecast_dates = pd.date_range(start=series.index[-1] + timedelta(days=1), periods=steps, freq='W-MON')
             return pd.Series([ma] * steps, index=forecast_dates), 0, 0
 
-    def _generate_xgboost_forecast(self, series, steps=24, refine=False):
+    def _generate_xgboost_forecast(self, series, steps=24, refine=False, series_key=None):
         """
         Generate forecast using XGBoost with Fourier Seasonality and Optional Hyperparameter Tuning.
+        With refine, tuned parameters are kept per series_key in the parameter store and the
+        search (successive halving) only reruns when they are stale or their backtest drifted.
+        Direct multi-horizon strategy: one model is trained on (origin, horizon) rows, so all
+        `steps` weeks come from a single batched predict at the last week (no recursive
+        feeding of predictions back in as lags).
         """
         if series.empty or len(series) < 20:
             return pd.Series(dtype=float), 0, 0
         
         try:
-            # Create lagged features
-            lookback = min(8, len(series) - 1)
-            df_features = pd.DataFrame({'target': series.values})
-            for lag in range(1, lookback + 1):
-                df_features[f'lag_{lag}'] = df_features['target'].shift(lag)
-            
-            # Add trend features
-            df_features['week_num'] = range(len(df_features))
-            df_features['rolling_mean_4'] = df_features['target'].rolling(4).mean()
-            df_features['rolling_std_4'] = df_features['target'].rolling(4).std()
-
-            # --- FOURIER TERMS (Seasonality) ---
-            # Assume annual seasonality (52 weeks)
-            df_features['sin_week'] = np.sin(2 * np.pi * df_features['week_num'] / 52)
-            df_features['cos_week'] = np.cos(2 * np.pi * df_features['week_num'] / 52)
-            
-            df_features = df_features.dropna()
-            
-            X = df_features.drop('target', axis=1).values
-            y = df_features['target'].values
+            # Features per origin (lags, week_num, rolling stats, Fourier) x horizon 1..steps
+            X, y = direct_training_set(series.values, horizon=steps)
             
             model_name = "GradientBoosting"
             model = None
@@ -869,56 +1207,18 @@ class CashFlowAnalyzer:
                 base_model = XGBRegressor(random_state=42, verbosity=0)
                 
                 if refine:
-                    print("    > Tuning Hyperparameters (RandomizedSearchCV)...")
-                    param_dist = {
-                        'n_estimators': [100, 200, 300],
-                        'max_depth': [3, 4, 5, 6],
-                        'learning_rate': [0.01, 0.05, 0.1, 0.2],
-                        'subsample': [0.7, 0.8, 0.9, 1.0],
-                        'colsample_bytree': [0.7, 0.8, 0.9, 1.0]
-                    }
-                    search = RandomizedSearchCV(base_model, param_dist, n_iter=10, cv=3, scoring='neg_mean_absolute_error', random_state=42, n_jobs=-1)
-                    search.fit(X, y)
-                    model = search.best_estimator_
-                    print(f"    > Best Params: {search.best_params_}")
+                    params, backtest = self._tuned_xgboost_params(series, X, y, series_key or 'series')
+                    model = XGBRegressor(**params, random_state=42, verbosity=0)
                 else:
                     model = XGBRegressor(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42, verbosity=0)
-                    model.fit(X, y)
             else:
                 model = GradientBoostingRegressor(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42)
-                model.fit(X, y)
+            # Reuse the registered fit for the same data, features and parameters
+            model, _ = default_registry().fit_or_load(f"direct_{model_name.lower()}", model, X, y, schema=feature_names())
             
-            # Recursive forecasting
-            predictions = []
-            last_values = list(series.values[-lookback:])
-            current_week = len(series)
-            rolling_vals = list(series.values[-4:])
-            
-            for i in range(steps):
-                # Build feature vector matching training columns
-                # [lag_1, ..., lag_8, week_num, roll_mean, roll_std, sin, cos]
-                
-                # lags (last_values reversed)
-                features = last_values[-lookback:][::-1] 
-                
-                # week_num
-                next_week_num = current_week + i
-                features.append(next_week_num) 
-                
-                # rolling stats
-                features.append(np.mean(rolling_vals))
-                features.append(np.std(rolling_vals) if len(rolling_vals) > 1 else 0)
-                
-                # Fourier
-                features.append(np.sin(2 * np.pi * next_week_num / 52))
-                features.append(np.cos(2 * np.pi * next_week_num / 52))
-                
-                pred = model.predict([features])[0]
-                predictions.append(pred)
-                
-                last_values.append(pred)
-                rolling_vals.append(pred)
-                if len(rolling_vals) > 4: rolling_vals.pop(0)
+            # All horizons from the last observed week in one batched predict
+            X_origin, origins = origin_features(series.values)
+            predictions = predict_horizons(model, X_origin[-1:], origins[-1:], steps)[0]
             
             # Create date index
             last_date = series.index[-1]
@@ -928,17 +1228,63 @@ class CashFlowAnalyzer:
             # Metrics (simplified backtest for speed or just reuse model score?)
             # Valid backtest requires re-training. 
             # We'll use the training error/score as proxy or run a quick check.
-            mae, r_squared = self._calculate_backtest_accuracy(series, model_type='xgboost')
+            if refine and HAS_XGBOOST:
+                mae, r_squared = backtest
+            else:
+                mae, r_squared = self._calculate_backtest_accuracy(series, model_type='xgboost', series_key=series_key)
             
             return forecast_series, mae, r_squared
             
         except Exception as e:
             print(f"  ⚠ XGBoost failed ({e}), using fallback...")
-            return self._generate_damped_trend_forecast(series, steps)
+            return self._generate_damped_trend_forecast(series, steps, name=series_key or 'series')
 
 
-    def _generate_damped_trend_forecast(self, series, steps=24):
-        """Fallback: Simple damped trend extrapolation."""
+    def _tuned_xgboost_params(self, series, X, y, series_key):
+        """
+        XGBoost parameters for one series: the stored ones while they are current, otherwise a
+        successive-halving search (9 candidates on 25 trees, the best 3 on 75, the winner on
+        225) whose winner is stored. Returns (params, backtest (MAE, R²) with those params).
+        """
+        key = f"xgboost:{series_key}"
+        fingerprint = series_fingerprint(series)
+        entry = self.param_store.get(key)
+        reason = "retune requested" if self.retune else self.param_store.tuning_reason(key, fingerprint)
+        
+        backtest = None
+        if reason is None and entry['fingerprint'] != fingerprint:
+            # New data: check the stored parameters still backtest as well as when tuned
+            backtest = self._calculate_backtest_accuracy(series, model_type='xgboost', params=entry['params'], series_key=series_key)
+            reason = self.param_store.tuning_reason(key, fingerprint, mae=backtest[0])
+        
+        if reason is None:
+            print(f"    > Reusing tuned parameters from {entry['tuned_at']}: {entry['params']}")
+            params = entry['params']
+            if backtest is None:
+                backtest = self._calculate_backtest_accuracy(series, model_type='xgboost', params=params, series_key=series_key)
+            return params, backtest
+        
+        print(f"    > Tuning Hyperparameters (successive halving, {reason})...")
+        param_dist = {
+            'max_depth': [3, 4, 5, 6],
+            'learning_rate': [0.01, 0.05, 0.1, 0.2],
+            'subsample': [0.7, 0.8, 0.9, 1.0],
+            'colsample_bytree': [0.7, 0.8, 0.9, 1.0]
+        }
+        search = HalvingRandomSearchCV(XGBRegressor(random_state=42, verbosity=0), param_dist,
+                                       n_candidates=9, factor=3, resource='n_estimators',
+                                       min_resources=25, max_resources=225, cv=3,
+                                       scoring='neg_mean_absolute_error', random_state=42, n_jobs=-1)
+        search.fit(X, y)
+        params = {k: v.item() if hasattr(v, 'item') else v for k, v in search.best_params_.items()}
+        print(f"    > Best Params: {params}")
+        
+        backtest = self._calculate_backtest_accuracy(series, model_type='xgboost', params=params, series_key=series_key)
+        self.param_store.put(key, params, fingerprint, backtest[0])
+        return params, backtest
+
+    def _generate_damped_trend_forecast(self, series, steps=24, name='series'):
+        """Fallback: Simple damped trend extrapolation (noise from the series' own seeded stream)."""
         if series.empty:
             return pd.Series(dtype=float), 0, 0
             
@@ -946,24 +1292,22 @@ class CashFlowAnalyzer:
         trend = series.diff().tail(8).mean() if len(series) > 8 else 0
         historical_std = series.std() if len(series) > 1 else abs(last_val) * 0.1
         
-        np.random.seed(42)
-        predictions = []
-        current = last_val
-        
-        for i in range(steps):
-            damped_trend = trend * (0.95 ** i)
-            noise = np.random.normal(0, historical_std * 0.3)
-            current = current + damped_trend + noise
-            predictions.append(current)
+        rng = np.random.default_rng(series_seed(name))
+        damped_trend = trend * (0.95 ** np.arange(steps))
+        noise = rng.normal(0, historical_std * 0.3, steps)
+        predictions = last_val + np.cumsum(damped_trend + noise)
         
         last_date = series.index[-1]
         forecast_dates = pd.date_range(start=last_date + timedelta(days=1), periods=steps, freq='W-MON')
         return pd.Series(predictions, index=forecast_dates), 0, 0
 
-    def _calculate_backtest_accuracy(self, series, model_type='xgboost', test_size=12):
+    def _calculate_backtest_accuracy(self, series, model_type='xgboost', test_size=12, params=None, series_key=None):
         """
         Calculate forecast accuracy using backtesting with XGBoost.
         Holds out last test_size points, trains on rest, evaluates.
+        params: XGBoost parameters to backtest (default: the untuned model).
+        series_key: also keep the results in self.backtest_results['by_series'][series_key].
+        For many origins and horizons use run_backtests.
         Returns (MAE, MAPE) and stores actual vs predicted for visualization.
         """
         if len(series) < test_size + 12:
@@ -973,49 +1317,22 @@ class CashFlowAnalyzer:
         test = series.iloc[-test_size:]
         
         try:
-            # Build XGBoost model for backtesting
-            lookback = min(8, len(train) - 1)
-            
-            # Create lagged features
-            df_features = pd.DataFrame({'target': train.values})
-            for lag in range(1, lookback + 1):
-                df_features[f'lag_{lag}'] = df_features['target'].shift(lag)
-            df_features['week_num'] = range(len(df_features))
-            df_features['rolling_mean_4'] = df_features['target'].rolling(4).mean()
-            df_features['rolling_std_4'] = df_features['target'].rolling(4).std()
-            df_features = df_features.dropna()
-            
-            X_train = df_features.drop('target', axis=1).values
-            y_train = df_features['target'].values
+            # One-step-ahead direct model on the training weeks (same features as the forecaster)
+            X_train, y_train = direct_training_set(train.values, horizon=1)
             
             # Fit model
             if HAS_XGBOOST:
-                model = XGBRegressor(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42, verbosity=0)
+                params = params or {'n_estimators': 100, 'max_depth': 4, 'learning_rate': 0.1}
+                model = XGBRegressor(**params, random_state=42, verbosity=0)
             else:
                 model = GradientBoostingRegressor(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42)
-            model.fit(X_train, y_train)
-            
-            # Predict on test period
-            predictions = []
-            last_values = list(train.values[-lookback:])
-            current_week = len(train)
-            rolling_vals = list(train.values[-4:])
-            
-            for i in range(test_size):
-                features = last_values[-lookback:][::-1]
-                features.append(current_week + i)
-                features.append(np.mean(rolling_vals))
-                features.append(np.std(rolling_vals) if len(rolling_vals) > 1 else 0)
-                
-                pred = model.predict([features])[0]
-                predictions.append(pred)
-                
-                # Use actual test value for next prediction (rolling forecast)
-                actual_val = test.iloc[i] if i < len(test) else pred
-                last_values.append(actual_val)
-                rolling_vals.append(actual_val)
-                if len(rolling_vals) > 4:
-                    rolling_vals.pop(0)
+            model, _ = default_registry().fit_or_load('backtest_one_step', model, X_train, y_train, schema=feature_names())
+            
+            # Rolling forecast: each test week predicted from the actuals before it,
+            # i.e. the origins len(train) - 1 .. len(series) - 2, scored in one predict call
+            X_all, origins = origin_features(series.values)
+            test_rows = (origins >= len(train) - 1) & (origins < len(series) - 1)
+            predictions = predict_horizons(model, X_all[test_rows], origins[test_rows], 1)[:, 0]
             
             # Store for visualization
             if not hasattr(self, 'backtest_results'):
@@ -1026,6 +1343,9 @@ class CashFlowAnalyzer:
                 'predicted': pd.Series(predictions, index=test.index),
                 'dates': test.index
             }
+            if series_key is not None:
+                # Same dict, also kept per series so later series don't replace it
+                self.backtest_results.setdefault('by_series', {})[series_key] = self.backtest_results['xgboost']
             
             # Calculate metrics (better alternatives to MAPE for cash flow)
             actuals = test.values
@@ -1059,19 +1379,131 @@ class CashFlowAnalyzer:
             print(f"  ⚠ Backtest error: {e}")
             return 0, 0
 
-    def detect_anomalies(self):
+    def run_backtests(self, max_workers=1, horizon=12, min_train=52):
+        """
+        Walk-forward backtests of the Holt and XGBoost forecasters over many origins (see
+        backtesting.py): total, every activity and the top categories. Fold fits are cached
+        under .cache/backtests, so a new week only fits the new origins.
+        Metrics per series and horizon go to self.backtest_report and BACKTEST_RESULTS_PATH.
+        min_train is capped at half the history (at least 12 weeks) so short ledgers still get folds.
+        """
+        print("\n=== ROLLING-ORIGIN BACKTESTS ===")
+        weekly_totals = self.cube.series('week')
+        min_train = min(min_train, max(12, len(weekly_totals) // 2))
+        series = {'Total': weekly_totals}
+        if 'Activity' in self.cube.dims:
+            panel = self.cube.series(('week', 'Activity')).unstack('Activity', fill_value=0)
+            panel = panel.reindex(weekly_totals.index, fill_value=0)
+            for act in panel.columns:
+                series[f"Activity: {act}"] = panel[act]
+        if 'Category' in self.cube.dims:
+            # Same top categories as create_forecasts
+            volumes = self.weekly_data.groupby('Category', observed=True)['weekly_amount_usd'].apply(lambda x: x.abs().sum())
+            for cat in volumes.nlargest(2).index:
+                cat_weekly = self.cube.series('week', where={'Category': cat})
+                series[f"Category: {cat}"] = cat_weekly.reindex(weekly_totals.index, fill_value=0)
+        
+        # Holt is cheap: every origin. XGBoost: every 4th origin, total + activities
+        runs = [
+            (HoltForecaster(), series, 1),
+            (DirectXGBForecaster(), {k: v for k, v in series.items() if not k.startswith('Category')}, 4),
+        ]
+        predictions, reports = [], []
+        for forecaster, subset, step in runs:
+            engine = RollingOriginBacktest(forecaster, horizon=horizon, min_train=min_train, step=step,
+                                           max_workers=max_workers)
+            preds = engine.run(subset)
+            preds.insert(0, 'model', forecaster.name)
+            predictions.append(preds)
+            report = backtest_metrics(preds.drop(columns='model'))
+            report.insert(0, 'model', forecaster.name)
+            reports.append(report)
+            print(f"  • {forecaster.name}: {len(subset)} series, {engine.fits + engine.cache_hits} folds "
+                  f"({engine.fits} fitted, {engine.cache_hits} from cache)")
+        
+        self.backtest_predictions = pd.concat(predictions, ignore_index=True)
+        self.backtest_report = pd.concat(reports).reset_index()
+        if self.backtest_report.empty:
+            print(f"  • Skipped: {len(weekly_totals)} weeks of history is too short for {min_train}-week training windows")
+            return True
+        self.backtest_report.to_csv(BACKTEST_RESULTS_PATH, index=False)
+        
+        # Headline: total net flow at 1 / 4 / 12 weeks ahead
+        total = self.backtest_report[self.backtest_report['series'] == 'Total']
+        for _, row in total[total['horizon'].isin([1, 4, horizon])].iterrows():
+            print(f"    {row['model']:<8} h={int(row['horizon']):>2}: MAE ${row['mae']/1e6:.2f}M, "
+                  f"R² {row['r_squared']:.2f}, direction {row['directional_acc']:.0f}%, corr {row['correlation']:.2f}")
+        print(f"  • Backtest metrics exported: {len(self.backtest_report)} rows")
+        return True
+
+    def run_scenarios(self, steps=24):
+        """
+        Stress tests on the 6M baseline (see scenarios.py): FX shocks per currency, delayed
+        category outflows and lost inflows of the top 5 entities, all applied to the same
+        inflow/outflow forecast matrices in one pass. Every scenario goes to one columnar file.
+        The baseline keeps each flow's sign and is reconciled to the exported 6M Base Case total.
+        """
+        print("\n=== SCENARIO & STRESS TESTS ===")
+        dims = [d for d in ['Name', 'Category', 'Activity', 'Curr.'] if d in self.cube.dims]
+        if 'inflow' not in self.cube.measures or not dims:
+            print("  • Skipped: needs the transaction-level cube (inflow/outflow measures)")
+            self.scenario_summary = None
+            return True
+        
+        # 1. Baseline: noise-free Holt 6M path of every leaf's inflows and outflows, one batch
+        weeks = self.cube.series('week').index
+        flows = {}
+        for measure in ['inflow', 'outflow']:
+            panel = self.cube.series(tuple(['week'] + dims), measure).unstack(dims, fill_value=0)
+            flows[measure] = panel.reindex(weeks, fill_value=0)
+        leaves = flows['inflow'].columns.union(flows['outflow'].columns)
+        matrix = np.vstack([flows[m].reindex(columns=leaves, fill_value=0).to_numpy(dtype=float).T for m in flows])
+        alphas, betas, _, _ = optimize_holt_batch(matrix, refine=1)
+        fc = holt_forecast_batch(matrix, alphas, betas, long_horizon=steps)
+        dates = pd.date_range(start=weeks[-1] + timedelta(days=1), periods=steps, freq='W-MON')
+        # Trends must not turn an inflow negative or an outflow positive at late horizons
+        inflow = pd.DataFrame(np.clip(fc['long_mean'][:len(leaves)], 0, None), index=leaves, columns=dates)
+        outflow = pd.DataFrame(np.clip(fc['long_mean'][len(leaves):], None, 0), index=leaves, columns=dates)
+        
+        # Same weekly net as the Base Case in the forecast export
+        base_total = getattr(self, 'forecasts', {}).get('total', {}).get('6month')
+        if base_total is not None and len(base_total) == steps:
+            inflow, outflow, missed = reconcile_to_total(inflow, outflow, base_total.to_numpy())
+            print(f"  • Baseline reconciled to the 6M Base Case forecast: ${base_total.sum()/1e6:.2f}M net"
+                  + (f" ({missed} weeks left unreconciled)" if missed else ""))
+        
+        # 2. Scenarios x leaves x weeks
+        outflows = self.cube.series('Name', 'gross_outflow_usd')
+        top_entities = outflows[outflows < 0].abs().nlargest(5).index.tolist() if 'Name' in dims else []
+        scenarios = default_scenarios(leaves, top_entities)
+        engine = ScenarioEngine(inflow, outflow)
+        sc_in, sc_out = engine.run(scenarios)
+        
+        # 3. Export + summary
+        path = export_scenarios(engine.to_frame(scenarios, sc_in, sc_out), SCENARIO_RESULTS_PATH)
+        self.scenario_summary = engine.summary(scenarios, sc_in, sc_out)
+        print(f"  • {len(scenarios)} scenarios x {len(leaves)} series x {steps} weeks -> {path}")
+        worst = self.scenario_summary.nsmallest(5, 'Impact_vs_Base_USD')
+        for _, row in worst.iterrows():
+            print(f"    {row['Scenario']:<32} 6M net impact: ${row['Impact_vs_Base_USD']/1e6:+.2f}M")
+        return True
+
+    def detect_anomalies(self, holiday_scope='entity'):
         """
         Detect anomalies using Advanced Multi-Variate Logic:
         1. Statistical Anomalies (Isolation Forest)
         2. Holiday Activity (Calendar-Aware Check)
         3. Round Number Risk (Manual Entry Flag)
         4. Duplicate Payments (Exact Match)
+        5. Near-Duplicates (strong re-post pairs, never overriding another label)
+        holiday_scope: 'entity' checks each entity against its own market's holidays only
+        (e.g. TW10 against Taiwan); 'union' flags a posting on any detected market's holiday.
         """
         print("\n=== ADVANCED ANOMALY DETECTION (ISOLATION FOREST + HOLIDAYS) ===")
         
         # Initialize
         self.df['anomaly_type'] = None
-        self.anomaly_metrics = {} # Store stats for plotting
+        self.anomaly_metrics = {'holiday_scope': holiday_scope} # Store stats for plotting
         
         # Ensure data exists
         if self.df.empty: return
@@ -1090,9 +1522,10 @@ class CashFlowAnalyzer:
             amt_reshaped = self.df['Amount in USD'].fillna(0).values.reshape(-1, 1)
             features['amount_scaled'] = scaler.fit_transform(amt_reshaped).flatten()
             
-            # B. Temporal Features
-            features['week_of_year'] = self.df['posting_date'].dt.isocalendar().week
-            features['day_of_week'] = self.df['posting_date'].dt.dayofweek
+            # B. Temporal Features (joined from the date dimension)
+            cal = self._calendar(self.df['posting_date'], ['Week_Num', 'day_of_week'])
+            features['week_of_year'] = cal['Week_Num']
+            features['day_of_week'] = cal['day_of_week']
             
             # C. Category Encoding
             if 'Category' in self.df.columns:
@@ -1106,7 +1539,12 @@ class CashFlowAnalyzer:
             features = features.fillna(0)
             
             try:
-                preds = iso_forest.fit_predict(features) # -1 is anomaly
+                # Same transactions and features -> the registered forest is loaded, not refitted
+                iso_forest, loaded = default_registry().fit_or_load(
+                    'isolation_forest', iso_forest, features.to_numpy(dtype=float), schema=features.columns)
+                if loaded:
+                    print("    - Loaded Isolation Forest from model registry.")
+                preds = iso_forest.predict(features.to_numpy(dtype=float)) # -1 is anomaly
                 
                 # Flag Anomalies (Only if not already flagged, though this is first step)
                 mask_anomaly = preds == -1
@@ -1121,44 +1559,24 @@ class CashFlowAnalyzer:
 
         # --- 2. HOLIDAY DETECTION (Dynamic Market) ---
         print("  • Checking for Holiday Activity...")
-        if HAS_HOLIDAYS and 'posting_date' in self.df.columns:
+        if HAS_HOLIDAYS and 'posting_date' in self.df.columns and self.date_dim is not None:
             # Strategy: Identify Countries from Name (e.g., TW10 -> TW) or default to US/UK
-            # We will create a composite holiday set for all found countries
-            
-            dataset_holidays = set()
-            years = self.df['posting_date'].dt.year.unique()
-            
-            # Attempt to guess countries from 'Name' column if it exists
-            countries_found = set()
-            if 'Name' in self.df.columns:
-                # Assuming Name contains code like 'TW10', 'US01' etc.
-                # Extract first 2 letters
-                potential_codes = self.df['Name'].dropna().astype(str).str[:2].unique()
-                for code in potential_codes:
-                    if code in holidays.list_supported_countries():
-                        countries_found.add(code)
-            
-            if not countries_found:
-                countries_found = {'US', 'GB'} # Default fallback
+            # The date dimension holds one holiday flag per market (is_holiday_<CC>)
+            if not self.holiday_markets:
                 print("    - No specific country codes found, defaulting to US/GB.")
+                mask_holiday = self._calendar(self.df['posting_date'], ['is_holiday'])['is_holiday'].fillna(False).astype(bool)
+            elif holiday_scope == 'union':
+                print(f"    - detected markets: {sorted(self.holiday_markets)} (any market's holiday, every entity)")
+                mask_holiday = self._calendar(self.df['posting_date'], ['is_holiday'])['is_holiday'].fillna(False).astype(bool)
             else:
-                print(f"    - detected markets: {countries_found}")
-
-            # Build Holiday Index
-            for country in countries_found:
-                try:
-                    ctry_holidays = holidays.Country(country, years=years)
-                    dataset_holidays.update(ctry_holidays.keys())
-                except:
-                    continue
-            
-            # Check dates
-            # Helper to check if date is in holiday set
-            # dataset_holidays contains date objects
-            def is_holiday(d):
-                return d.date() in dataset_holidays
-
-            mask_holiday = self.df['posting_date'].apply(is_holiday)
+                print(f"    - detected markets: {sorted(self.holiday_markets)} (each entity vs its own market)")
+                # Each entity is checked against its own market's calendar only
+                market_cols = [f"is_holiday_{c}" for c in sorted(self.holiday_markets) if f"is_holiday_{c}" in self.date_dim.columns]
+                cal = self._calendar(self.df['posting_date'], market_cols)
+                entity_market = self.df['Name'].astype(str).str[:2]
+                mask_holiday = pd.Series(False, index=self.df.index)
+                for col in market_cols:
+                    mask_holiday |= (entity_market == col[-2:]) & cal[col].fillna(False).astype(bool)
             
             # Label as 'Holiday Activity' if detected and NOT already a specific type (or override?)
             # User said: "Flag transactions occurring on holidays as 'Holiday Activity'"
@@ -1177,7 +1595,7 @@ class CashFlowAnalyzer:
         print("  • Scanning for POTENTIAL Duplicate Payments...")
         # STRATEGY: Trust the Cleaned CSV Flag (Per-Entity Check Logic)
         if 'is_potential_duplicate' in self.df.columns:
-             mask_dupes = self.df['is_potential_duplicate'] == True
+             mask_dupes = self.df['is_potential_duplicate'].fillna(False).astype(bool)
              self.df.loc[mask_dupes, 'anomaly_type'] = 'Duplicate Payment'
              print(f"    - Flagged {mask_dupes.sum()} duplicates (Source: Cleaned Data).")
         else:
@@ -1187,6 +1605,20 @@ class CashFlowAnalyzer:
                  duplicates = self.df.duplicated(subset=dupe_cols, keep=False)
                  self.df.loc[duplicates, 'anomaly_type'] = 'Duplicate Payment'
                  print(f"    - Flagged {duplicates.sum()} duplicates (Runtime Recalculation).")
+        
+        # Near-duplicates across the whole loaded ledger: same entity/currency, amount within
+        # rounding, re-posted within a few days (blocked sort-and-window join, pair evidence kept).
+        # Only strong pairs (similarity >= NEAR_DUPLICATE_THRESHOLD) are flagged, as their own
+        # 'Near-Duplicate' type, and only on rows no other check has labelled
+        self.duplicate_pairs = pd.DataFrame()
+        if all(col in self.df.columns for col in ['Amount in USD', 'posting_date', 'Name']):
+             self.duplicate_pairs = find_duplicate_pairs(self.df)
+             self.df['duplicate_score'] = duplicate_scores(len(self.df), self.duplicate_pairs)
+             mask_near = (self.df['duplicate_score'] >= NEAR_DUPLICATE_THRESHOLD) & self.df['anomaly_type'].isna()
+             self.df.loc[mask_near, 'anomaly_type'] = 'Near-Duplicate'
+             n_exact = int(self.duplicate_pairs['is_exact'].sum()) if len(self.duplicate_pairs) else 0
+             print(f"    - Near-duplicate pairs: {len(self.duplicate_pairs)} ({n_exact} exact). "
+                   f"Flagged {mask_near.sum()} rows as Near-Duplicate (similarity >= {NEAR_DUPLICATE_THRESHOLD}).")
 
         # --- 4. ROUND NUMBERS (Keep Logic) ---
         print("  • Scanning for Round Number Risk...")
@@ -1205,6 +1637,7 @@ class CashFlowAnalyzer:
         # Risk Scoring
         risk_map = {
             'Duplicate Payment': 4,
+            'Near-Duplicate': 3,
             'Statistical Anomaly (IsoForest)': 3,
             'Round Number Risk': 2,
             'Holiday Activity': 1
@@ -1225,8 +1658,8 @@ class CashFlowAnalyzer:
         # 1. Efficiency Drag (Net Deficit Sum)
         # Calculate daily interpolated flow (similar to Fig 2 logic)
         eff_drag = 0
-        if self.weekly_data is not None:
-             net_flow = self.weekly_data.groupby('week')['weekly_amount_usd'].sum()
+        if self.cube is not None:
+             net_flow = self.cube.series('week')
              # Any week with Negative Flow is a 'Deficit Gap' requiring 
              # liquidity coverage (Cost of Capital).
              # We sum the specific deficit weeks to show "Liquidity Pressure".
@@ -1264,40 +1697,26 @@ class CashFlowAnalyzer:
         
         if 'Category' not in self.weekly_data.columns: return
         
-        # Add Week Number
-        df = self.weekly_data.copy()
-        df['week_num'] = df.index.map(lambda x: pd.Timestamp(x).isocalendar().week) # approx from index if week is index? 
-        # Actually weekly_data has 'week' column which is date.
-        df['week_num'] = df['week'].dt.isocalendar().week
-        
         # Identify "High Impact" Weeks (> 75th percentile of weekly volume)
-        weekly_vol = df.groupby('week')['weekly_amount_usd'].sum()
+        weekly_vol = self.cube.series('week')
         threshold = weekly_vol.quantile(0.75)
         high_weeks = weekly_vol[weekly_vol > threshold]
         
         print(f"  • Analyzing {len(high_weeks)} High-Impact Weeks for Root Causes...")
         
-        for date, amount in high_weeks.items():
-            # Drill down
-            week_num = pd.Timestamp(date).isocalendar().week
-            subset = df[df['week'] == date]
-            
+        high_week_nums = self._calendar(pd.Series(high_weeks.index), ['Week_Num'])['Week_Num'].values
+        
+        for (date, amount), week_num in zip(high_weeks.items(), high_week_nums):
+            # Drill down (cube slice for that week)
             # 1. Top Category
-            top_cat = subset.groupby('Category')['weekly_amount_usd'].sum().nlargest(1)
+            top_cat = self.cube.series('Category', where={'week': date}).nlargest(1)
             cat_name = top_cat.index[0]
             cat_val = top_cat.values[0]
             
-            # 2. Top Vendor (Need raw data interaction, or we assume subset has 'Name' if we didn't drop it)
-            # self.weekly_data is aggregated? Check main df
-            # We need to look at self.df for Vendor details on that date range.
-            week_start = pd.Timestamp(date)
-            week_end = week_start + pd.Timedelta(days=6)
-            mask = (self.df['posting_date'] >= week_start) & (self.df['posting_date'] <= week_end)
-            raw_subset = self.df[mask]
-            
+            # 2. Top Vendor (posting days Monday..Sunday of that week)
             vendor_name = "Various"
-            if not raw_subset.empty and 'Name' in raw_subset.columns:
-                 top_ven = raw_subset.groupby('Name')['Amount in USD'].sum().nlargest(1)
+            if 'Name' in self.cube.dims:
+                 top_ven = self.cube.series('Name', 'gross_usd', where={'week': date}).nlargest(1)
                  if not top_ven.empty:
                      vendor_name = top_ven.index[0]
             
@@ -1340,18 +1759,18 @@ class CashFlowAnalyzer:
         """Identifies reasons for predicted dips based on historical patterns (NOT AI)."""
         if 'total' not in self.forecasts: return "No predicted dips.", "N/A"
         fc = self.forecasts['total']['6month']
-        avg_vol = self.weekly_data.groupby('week')['weekly_amount_usd'].sum().mean()
+        avg_vol = self.cube.series('week').mean()
         
         # Identify Worst Week in Forecast
         dip_week = fc.idxmin()
         dip_val = fc.min()
         
         if dip_val < (avg_vol * 0.5): # If dip is > 50% below average
-             w_num = dip_week.weekofyear
+             w_num = dip_week.isocalendar()[1]
              # RCA: Match with history
-             hist_match = self.df[self.df['posting_date'].dt.isocalendar().week == w_num]
+             hist_match = self.cube.series('Category', where={'Week_Num': w_num})
              if not hist_match.empty:
-                 top_cat = hist_match.groupby('Category')['Net_Amount_USD'].sum().idxmin()
+                 top_cat = hist_match.idxmin()
                  return f"Forecasted dip in Week {w_num} matched historical {top_cat} seasonality.", f"W{w_num}"
         return "No high-variance dips detected.", "None"
 
@@ -1438,7 +1857,7 @@ class CashFlowAnalyzer:
         ax1.yaxis.set_major_formatter(currency_fmt) # [FIX] Apply Format
         
         # 1. Historical Net Flow (Line instead of Bars for continuity)
-        weekly_net = self.weekly_data.groupby('week')['weekly_amount_usd'].sum()
+        weekly_net = self.cube.series('week')
         history = weekly_net.tail(16) # Show a bit more history
         
         # Plot History
@@ -1571,7 +1990,7 @@ class CashFlowAnalyzer:
         
         if 'Category' in self.weekly_data.columns:
             # Pivot Weekly -> Resample Monthly Sum
-            cat_pivot_weekly = self.weekly_data.pivot_table(index='week', columns='Category', values='weekly_amount_usd', aggfunc='sum').fillna(0)
+            cat_pivot_weekly = self.cube.series(('week', 'Category')).unstack('Category').fillna(0)
             cat_pivot_monthly = cat_pivot_weekly.resample('M').sum().abs() 
             
             # Filter Top 5 Categories
@@ -1714,12 +2133,12 @@ class CashFlowAnalyzer:
         zoom_start = last_date - pd.Timedelta(days=7)
         
         # DAILY (Keep Full History)
-        daily_agg = self.df.groupby('posting_date')['Net_Amount_USD'].sum().reset_index().sort_values('posting_date')
+        daily_agg = self.cube.series('date').rename_axis('posting_date').reset_index(name='Net_Amount_USD')
         
         # WEEKLY (Labels: W42, W43...)
         weekly_agg = self.weekly_data.sort_values('week').copy()
         try:
-             weekly_agg['week_label'] = weekly_agg['week'].apply(lambda x: f"W{x.isocalendar()[1]} '{x.strftime('%y')}" if hasattr(x, 'isocalendar') else str(x))
+             weekly_agg['week_label'] = self._calendar(weekly_agg['week'], ['week_label'])['week_label'].values
         except:
              weekly_agg['week_label'] = weekly_agg['week'].astype(str)
         
@@ -1728,9 +2147,7 @@ class CashFlowAnalyzer:
         zoom_weeks = distinct_weeks[-20:] if len(distinct_weeks) > 20 else distinct_weeks
 
         # MONTHLY
-        monthly_agg = self.df.copy()
-        monthly_agg['Month'] = monthly_agg['posting_date'].dt.to_period('M').astype(str)
-        monthly_agg = monthly_agg.groupby('Month')['Net_Amount_USD'].sum().reset_index()
+        monthly_agg = self.cube.series('month_label').rename_axis('Month').reset_index(name='Net_Amount_USD')
         
         # 2. Add Traces for Each Grain
         
@@ -1745,7 +2162,7 @@ class CashFlowAnalyzer:
         # Monthly Anomalies (DE-STACKED via Y-Offset on y2)
         if self.anomalies is not None and not self.anomalies.empty:
             anoms_m = self.anomalies.copy()
-            anoms_m['Month'] = anoms_m['posting_date'].dt.to_period('M').astype(str)
+            anoms_m['Month'] = self._calendar(anoms_m['posting_date'], ['month_label'])['month_label']
             # Group by Month AND Type
             anoms_m_agg = anoms_m.groupby(['Month', 'anomaly_type'])['Amount in USD'].sum().reset_index()
             
@@ -1782,7 +2199,7 @@ class CashFlowAnalyzer:
         if self.anomalies is not None:
              anoms_w = self.anomalies.copy()
              try:
-                 anoms_w['week_label'] = anoms_w['posting_date'].apply(lambda x: f"W{x.isocalendar()[1]} '{x.strftime('%y')}")
+                 anoms_w['week_label'] = self._calendar(anoms_w['posting_date'], ['week_label'])['week_label']
              except:
                  anoms_w['week_label'] = 'Unknown'
              
@@ -1864,7 +2281,7 @@ class CashFlowAnalyzer:
         iso_map = {'TW10': 'TWN', 'PH10': 'PHL', 'TH10': 'THA', 'ID10': 'IDN', 'SS10': 'SGP', 'MY10': 'MYS', 'VN20': 'VNM', 'KR10': 'KOR'}
         
         # Data Aggregation for Map
-        net_by_ent = self.df.groupby('Name')['Net_Amount_USD'].sum() if 'Net_Amount_USD' in self.df.columns else pd.Series(dtype=float)
+        net_by_ent = self.cube.series('Name') if 'Net_Amount_USD' in self.df.columns else pd.Series(dtype=float)
         
         # Prepare Choropleth Data
         choro_iso = []
@@ -1877,10 +2294,10 @@ class CashFlowAnalyzer:
 
         # Risk Data Sources (Global)
         dupes_only = self.anomalies[self.anomalies['anomaly_type'] == 'Duplicate Payment'] if self.anomalies is not None else pd.DataFrame()
-        dupe_by_ent = dupes_only.groupby('Name')['Amount in USD'].apply(lambda x: x.abs().sum()) if not dupes_only.empty else pd.Series(dtype=float)
+        dupe_by_ent = dupes_only.groupby('Name', observed=True)['Amount in USD'].apply(lambda x: x.abs().sum()) if not dupes_only.empty else pd.Series(dtype=float)
         
         anoms_only = self.anomalies[self.anomalies['anomaly_type'] == 'Statistical Anomaly (IsoForest)'] if self.anomalies is not None else pd.DataFrame()
-        anom_by_ent = anoms_only.groupby('Name')['Amount in USD'].sum() if not anoms_only.empty else pd.Series(dtype=float)
+        anom_by_ent = anoms_only.groupby('Name', observed=True)['Amount in USD'].sum() if not anoms_only.empty else pd.Series(dtype=float)
 
         for code, info in geo_map.items():
             lat, lon, name = info[1], info[2], info[0]
@@ -1964,7 +2381,7 @@ class CashFlowAnalyzer:
         geo_map = {'TW10': ['Taiwan', 23.6, 120.9], 'PH10': ['Philippines', 12.8, 121.7], 'TH10': ['Thailand', 15.8, 100.9], 'ID10': ['Indonesia', -0.7, 113.9], 'SS10': ['Singapore', 1.3, 103.8], 'MY10': ['Malaysia', 4.2, 101.9], 'VN20': ['Vietnam', 14.0, 108.2], 'KR10': ['South Korea', 35.9, 127.7]}
         
         # Calculate Aggregates
-        net_by_ent = self.df.groupby('Name')['Net_Amount_USD'].sum() if 'Net_Amount_USD' in self.df.columns else pd.Series(dtype=float)
+        net_by_ent = self.cube.series('Name') if 'Net_Amount_USD' in self.df.columns else pd.Series(dtype=float)
         
         # Trace Collections
         net_surplus_lats, net_surplus_lons, net_surplus_sizes, net_surplus_text = [], [], [], []
@@ -1974,10 +2391,10 @@ class CashFlowAnalyzer:
 
         # Risk Data Sources (Global)
         dupes_only = self.anomalies[self.anomalies['anomaly_type'] == 'Duplicate Payment'] if self.anomalies is not None else pd.DataFrame()
-        dupe_by_ent = dupes_only.groupby('Name')['Amount in USD'].apply(lambda x: x.abs().sum()) if not dupes_only.empty else pd.Series(dtype=float)
+        dupe_by_ent = dupes_only.groupby('Name', observed=True)['Amount in USD'].apply(lambda x: x.abs().sum()) if not dupes_only.empty else pd.Series(dtype=float)
         
         anoms_only = self.anomalies[self.anomalies['anomaly_type'] == 'Statistical Anomaly (IsoForest)'] if self.anomalies is not None else pd.DataFrame()
-        anom_by_ent = anoms_only.groupby('Name')['Amount in USD'].sum() if not anoms_only.empty else pd.Series(dtype=float)
+        anom_by_ent = anoms_only.groupby('Name', observed=True)['Amount in USD'].sum() if not anoms_only.empty else pd.Series(dtype=float)
         
         # Helper
         def smart_fmt(v):
@@ -2037,7 +2454,7 @@ class CashFlowAnalyzer:
 
         # --- FIG 2: 1-MONTH FORECAST WITH CONFIDENCE ---
         f2 = go.Figure()
-        hist = self.weekly_data.groupby('week')['weekly_amount_usd'].sum().tail(12)  # 12 weeks trailing for 1M view
+        hist = self.cube.series('week').tail(12)  # 12 weeks trailing for 1M view
         f2.add_trace(go.Scatter(x=hist.index, y=hist.values, name="History", line=dict(color=c_text, width=3)))
         risk_1m = []
         dip_weeks_1m = []
@@ -2048,7 +2465,7 @@ class CashFlowAnalyzer:
         for wk, val in hist.items():
             if val < avg_hist * 0.7:
                 w_num = wk.isocalendar()[1] if hasattr(wk, 'isocalendar') else 0
-                grp = self.df[self.df['posting_date'].dt.isocalendar().week == w_num].groupby('Category')['Net_Amount_USD'].sum()
+                grp = self.cube.series('Category', where={'Week_Num': w_num})
                 if not grp.empty:
                     top_cats = grp.sort_values().head(3)
                     drivers = " | ".join([f"{c}: ${v/1e6:.1f}M" for c, v in top_cats.items()])
@@ -2067,6 +2484,10 @@ class CashFlowAnalyzer:
             f2.add_trace(go.Scatter(x=fc_1m.index, y=fc_1m.values, name="1M Forecast", line=dict(color=AZ['navy'], width=2, dash='dash')))
             # Confidence: starts from first forecast point
             upper_c, lower_c = fc_1m + rmse, fc_1m - rmse
+            if 'intervals' in self.forecasts['total']:
+                # Simulated P5-P95 band
+                bands = self.forecasts['total']['intervals'].reindex(fc_1m.index)
+                upper_c, lower_c = bands['p95'], bands['p5']
             f2.add_trace(go.Scatter(x=list(fc_1m.index)+list(fc_1m.index)[::-1], y=list(upper_c)+list(lower_c)[::-1], fill='toself', fillcolor='rgba(60, 16, 83, 0.15)', line=dict(color='rgba(0,0,0,0)'), name='Confidence'))
             # Risk Detection + Dip Highlighting with Top Driver RCA
             avg_h = hist.mean()
@@ -2075,7 +2496,7 @@ class CashFlowAnalyzer:
                 if val < avg_h * 0.7:
                     w_num = wk.isocalendar()[1] if hasattr(wk, 'isocalendar') else 0
                     # Get historical pattern for this week number, or use trend analysis
-                    grp = self.df[self.df['posting_date'].dt.isocalendar().week == w_num].groupby('Category')['Net_Amount_USD'].sum() if w_num else pd.Series(dtype=float)
+                    grp = self.cube.series('Category', where={'Week_Num': w_num}) if w_num else pd.Series(dtype=float)
                     
                     if not grp.empty and len(grp) > 0:
                         top_cats = grp.sort_values().head(3)  # Most negative = biggest outflow
@@ -2110,7 +2531,7 @@ class CashFlowAnalyzer:
             
         # --- FIG 3: 6-MONTH FORECAST WITH INSIGHTS ---
         f3 = go.Figure()
-        hist_long = self.weekly_data.groupby('week')['weekly_amount_usd'].sum()  # All historical data
+        hist_long = self.cube.series('week')  # All historical data
         f3.add_trace(go.Scatter(x=hist_long.index, y=hist_long.values, name="History", line=dict(color=c_text, width=3)))
         risk_6m = []
         if 'total' in self.forecasts:
@@ -2125,6 +2546,10 @@ class CashFlowAnalyzer:
             
             # Confidence
             upper_c, lower_c = fc_6m + (rmse*1.5), fc_6m - (rmse*1.5) # Wider range for long term
+            if 'intervals' in self.forecasts['total']:
+                # Simulated P5-P95 band
+                bands = self.forecasts['total']['intervals'].reindex(fc_6m.index)
+                upper_c, lower_c = bands['p95'], bands['p5']
             f3.add_trace(go.Scatter(x=list(fc_6m.index)+list(fc_6m.index)[::-1], y=list(upper_c)+list(lower_c)[::-1], fill='toself', fillcolor='rgba(60, 16, 83, 0.15)', line=dict(color='rgba(0,0,0,0)'), name='Confidence'))
 
             # Insights
@@ -2141,7 +2566,7 @@ class CashFlowAnalyzer:
         f4 = go.Figure()
         if 'Category' in self.df.columns and 'Net_Amount_USD' in self.df.columns:
             # 1. Aggregation
-            cat_agg = self.df.groupby('Category')['Net_Amount_USD'].sum()
+            cat_agg = self.cube.series('Category')
             
             # 2. Sort by Absolute Value (Magnitude)
             cat_agg_sorted = cat_agg.iloc[cat_agg.abs().argsort()[::-1]]
@@ -2359,7 +2784,7 @@ class CashFlowAnalyzer:
         # TOP COST DRIVER INSIGHT (New Request)
         if 'Category' in self.df.columns and 'Net_Amount_USD' in self.df.columns:
              # Re-use aggregation logic or re-calculate locally
-             cat_agg_net = self.df.groupby('Category')['Net_Amount_USD'].sum()
+             cat_agg_net = self.cube.series('Category')
              # Filter for outflows (negative net)
              outflows = cat_agg_net[cat_agg_net < 0].abs()
              if not outflows.empty:
@@ -2558,7 +2983,7 @@ class CashFlowAnalyzer:
             </div>
         </body></html>
         """
-        with open('AstraZeneca_Interactive_Insights_CommandCenter.html', 'w', encoding='utf-8') as f: f.write(html)
+        with open(DASHBOARD_PATH, 'w', encoding='utf-8') as f: f.write(html)
         print("Success: Strategic Command Generated.")
 
     def generate_insights(self):
@@ -2585,7 +3010,7 @@ class CashFlowAnalyzer:
         
         # Identify key drivers
         if 'Category' in self.weekly_data.columns:
-            category_impact = self.weekly_data.groupby('Category')['weekly_amount_usd'].sum().sort_values(ascending=False).head(5)
+            category_impact = self.cube.series('Category').sort_values(ascending=False).head(5)
             
             insights['key_drivers'] = [
                 f"{category}: ${amount:,.2f}" 
@@ -2595,6 +3020,10 @@ class CashFlowAnalyzer:
         # Identify risks
         if len(self.anomalies) > 0:
             insights['risks'].append(f"{len(self.anomalies)} anomalous transactions detected requiring review")
+            holidays = int((self.anomalies['anomaly_type'] == 'Holiday Activity').sum())
+            if holidays:
+                scope = getattr(self, 'anomaly_metrics', {}).get('holiday_scope', 'entity')
+                insights['risks'].append(f"{holidays} postings on public holidays (checked against {HOLIDAY_SCOPES[scope]})")
         
         # Check for concentration risk
         if 'Category' in self.weekly_data.columns and len(insights['key_drivers']) > 0:
@@ -2633,29 +3062,85 @@ class CashFlowAnalyzer:
         
         return insights
 
-def main():
-    """Main function to run the complete cash flow analysis."""
+def main(clean=False, max_workers=None, chunk_rows=None, use_cache=True, rebuild=(), jobs=None,
+         all_series=False, forecast_workers=None, retune=False, global_model=False,
+         arima_benchmark=False, backtests=False, holiday_scope='entity'):
+    """
+    Main function to run the complete cash flow analysis.
+    clean=True runs clean_data.clean_dataset first and hands the result over in memory.
+    chunk_rows streams the cleaned dataset for the weekly forecasts only (out-of-core mode).
+    Stages whose code and inputs are unchanged are restored from the artifact cache
+    (use_cache=False disables it; stages named in rebuild always rerun, with everything downstream).
+    jobs: worker processes for independent stages (e.g. forecasts and anomaly detection); 1 = sequential.
+    all_series forecasts every category and entity, on forecast_workers processes
+    (also used for the backtest folds).
+    retune forces a fresh XGBoost hyperparameter search (otherwise stored parameters are reused).
+    global_model adds forecasts from one panel model trained across every ledger series.
+    arima_benchmark adds the ARIMA 1M benchmark; backtests runs the rolling-origin backtests stage.
+    Both are opt-in so the default run stays as fast as the original script.
+    holiday_scope: see HOLIDAY_SCOPES ('union' restores the original any-market holiday check).
+    """
     print("=== ASTRAZENECA CASH FLOW CHALLENGE ANALYSIS ===")
     print("Using Pandas for reliable data processing")
     
     # Initialize analyzer
     analyzer = CashFlowAnalyzer('MATERIALS/Datathon Dataset.xlsx')
+    if clean:
+        print("Cleaning workbook in-process...")
+        analyzer.data = clean_dataset(analyzer.dataset_path, max_workers=max_workers)
     
-    # Run analysis pipeline
-    if analyzer.load_data():
-        analyzer.explore_data()
-        analyzer.preprocess_data()
-        analyzer.create_forecasts()
-        analyzer.detect_anomalies()
-        analyzer.generate_interactive_dashboard()
-        insights = analyzer.generate_insights()
-        
-        # Answer the specific problem statement questions
-        analyzer.answer_suggested_questions()
-        
+    if chunk_rows:
+        # Row-level stages (anomalies, dashboard, entity forecasts) need the full frame
+        if analyzer.preprocess_data(chunk_rows=chunk_rows):
+            analyzer.create_forecasts(all_series=all_series, max_workers=forecast_workers, retune=retune,
+                                      global_model=global_model, arima_benchmark=arima_benchmark)
+            print("\n=== STREAMING ANALYSIS COMPLETE (weekly forecasts only) ===")
+        return
+    
+    # Run analysis pipeline (load -> explore -> preprocess -> forecasts -> anomalies -> dashboard -> insights -> questions)
+    stages = [stage for stage in PIPELINE_STAGES if backtests or stage.name != 'backtests']
+    forecast_params = {}
+    if all_series:
+        forecast_params.update(all_series=True, max_workers=forecast_workers)
+    if retune:
+        forecast_params.update(retune=True)
+    if global_model:
+        forecast_params.update(global_model=True)
+    if arima_benchmark:
+        forecast_params.update(arima_benchmark=True)
+    if forecast_params:
+        stages = [stage.with_params(**forecast_params) if stage.name == 'forecasts' else stage for stage in stages]
+    if forecast_workers:
+        stages = [stage.with_params(max_workers=forecast_workers) if stage.name == 'backtests' else stage for stage in stages]
+    if holiday_scope != 'entity':
+        stages = [stage.with_params(holiday_scope=holiday_scope) if stage.name == 'anomalies' else stage for stage in stages]
+    pipeline = Pipeline(analyzer, stages, source_key=analyzer.source_fingerprint(),
+                        use_cache=use_cache, max_workers=jobs)
+    if pipeline.run(rebuild=rebuild) is not False:
         print("\n=== ANALYSIS COMPLETE ===")
     else:
         print("Failed to load dataset. Please check the file path.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the AstraZeneca cash flow analysis.")
+    parser.add_argument('--clean', action='store_true', help="Clean the workbook in-process first (no intermediate CSV)")
+    parser.add_argument('--workers', type=int, default=None, help="Processes used to parse the workbook with --clean")
+    parser.add_argument('--chunk-rows', type=int, default=None, help="Out-of-core mode: stream the cleaned dataset in chunks and run the weekly forecasts only")
+    parser.add_argument('--no-cache', action='store_true', help="Recompute every stage (ignore cached artifacts)")
+    parser.add_argument('--rebuild', nargs='+', default=(), choices=[stage.name for stage in PIPELINE_STAGES],
+                        help="Stages to recompute (with everything downstream of them)")
+    parser.add_argument('--jobs', type=int, default=None, help="Processes for independent pipeline stages (default: one per CPU)")
+    parser.add_argument('--all-series', action='store_true', help="Forecast every category and entity (and every ledger series), not just the top drivers")
+    parser.add_argument('--forecast-workers', type=int, default=None, help="Processes for --all-series forecasting and the rolling-origin backtests")
+    parser.add_argument('--retune', action='store_true', help="Re-run the XGBoost hyperparameter search instead of reusing stored parameters")
+    parser.add_argument('--global-model', action='store_true', help="Also forecast every ledger series with one global panel model")
+    parser.add_argument('--arima-benchmark', action='store_true', help="Also fit the auto-order ARIMA 1M benchmark for the total")
+    parser.add_argument('--holiday-scope', choices=sorted(HOLIDAY_SCOPES), default='entity',
+                        help="Holiday check per entity market (default) or against every detected market's holidays")
+    parser.add_argument('--backtests', action='store_true', help="Run the rolling-origin backtests (Holt + XGBoost over many origins)")
+    args = parser.parse_args()
+    main(clean=args.clean, max_workers=args.workers, chunk_rows=args.chunk_rows,
+         use_cache=not args.no_cache, rebuild=args.rebuild, jobs=args.jobs,
+         all_series=args.all_series, forecast_workers=args.forecast_workers, retune=args.retune,
+         global_model=args.global_model, arima_benchmark=args.arima_benchmark, backtests=args.backtests,
+         holiday_scope=args.holiday_scope)
\ No newline at end of file
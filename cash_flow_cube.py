@@ -0,0 +1,93 @@
+import pandas as pd
+import numpy as np
+
+from date_dimension import build_date_dimension, date_key, lookup_calendar_by_key
+
+# Non-time dimensions of the cube (kept when present in the source frame)
+CUBE_DIMENSIONS = ['Name', 'Category', 'Activity', 'Curr.']
+# Measures per cell; gross_* use 'Amount in USD' as-is, the others the signed net amount
+CUBE_MEASURES = ['net', 'inflow', 'outflow', 'abs_volume', 'count', 'gross_usd', 'gross_outflow_usd']
+
+
+class CashFlowCube:
+    """
+    Pre-aggregated cash-flow measures over posting day x Name x Category x Activity x Curr.
+
+    The transactions are scanned once into base cells (one row per non-empty combination).
+    Any roll-up is then a groupby over those cells: non-time dimensions by name, time through
+    the date dimension (any of its columns, e.g. 'date', 'week', 'month_label', 'Week_Num').
+    Roll-ups are cached, so repeated queries from the forecasting and dashboard code are free.
+    Like a plain groupby, cells with a missing value in a queried dimension are left out.
+    """
+    def __init__(self, cells, date_dim, dims, measures):
+        self.cells = cells
+        self.date_dim = date_dim
+        self.dims = list(dims)
+        self.measures = list(measures)
+        self._calendar_cache = {}
+        self._rollup_cache = {}
+
+    @classmethod
+    def from_transactions(cls, df, date_dim, value_col='Net_Amount_USD', gross_col='Amount in USD', date_col='posting_date'):
+        """Build the cube from cleaned transactions (one pass over the rows)."""
+        dims = [c for c in CUBE_DIMENSIONS if c in df.columns]
+        net = df[value_col].astype(float)
+        gross = df[gross_col].astype(float) if gross_col in df.columns else net
+
+        frame = pd.DataFrame({'date_key': date_key(df[date_col])}, index=df.index)
+        for col in dims:
+            frame[col] = df[col]
+        frame['net'] = net
+        frame['inflow'] = net.where(net > 0, 0.0)
+        frame['outflow'] = net.where(net < 0, 0.0)
+        frame['abs_volume'] = net.abs()
+        frame['count'] = 1
+        frame['gross_usd'] = gross
+        frame['gross_outflow_usd'] = gross.where(gross < 0, 0.0)
+
+        cells = frame.groupby(['date_key'] + dims, observed=True, dropna=False, sort=False)[CUBE_MEASURES].sum().reset_index()
+        return cls(cells, date_dim, dims, CUBE_MEASURES)
+
+    @classmethod
+    def from_weekly(cls, weekly_data, value_col='weekly_amount_usd'):
+        """Net-only cube from (week, Category, Activity) aggregates, e.g. the streaming mode output."""
+        dims = [c for c in CUBE_DIMENSIONS if c in weekly_data.columns]
+        cells = pd.DataFrame({'date_key': date_key(weekly_data['week'])}, index=weekly_data.index)
+        for col in dims:
+            cells[col] = weekly_data[col]
+        cells['net'] = weekly_data[value_col].astype(float)
+        return cls(cells.reset_index(drop=True), build_date_dimension(weekly_data['week']), dims, ['net'])
+
+    def _column(self, name):
+        """A dimension column aligned to the cells; time attributes are looked up once per name."""
+        if name in self.dims:
+            return self.cells[name]
+        if name not in self._calendar_cache:
+            if self.date_dim is None or name not in self.date_dim.columns:
+                raise KeyError(f"Unknown cube dimension: {name}")
+            cal = lookup_calendar_by_key(self.date_dim, self.cells['date_key'], [name], index=self.cells.index)
+            self._calendar_cache[name] = cal[name]
+        return self._calendar_cache[name]
+
+    def rollup(self, by, where=None):
+        """
+        Every measure summed over the dimensions in `by` (str or tuple), optionally restricted
+        to cells matching `where` ({dimension: value}). Cached per (by, where).
+        """
+        by = (by,) if isinstance(by, str) else tuple(by)
+        where = tuple(sorted((where or {}).items()))
+        key = (by, where)
+        if key not in self._rollup_cache:
+            cells = self.cells
+            if where:
+                mask = np.ones(len(cells), dtype=bool)
+                for name, value in where:
+                    mask &= (self._column(name) == value).to_numpy(dtype=bool, na_value=False)
+                cells = cells[mask]
+            keys = [self._column(name)[cells.index].rename(name) for name in by]
+            self._rollup_cache[key] = cells[self.measures].groupby(keys, observed=True).sum()
+        return self._rollup_cache[key]
+
+    def series(self, by, measure='net', where=None):
+        """One measure of a roll-up as a Series indexed by `by`."""
+        return self.rollup(by, where)[measure]
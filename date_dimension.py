@@ -0,0 +1,103 @@
+import pandas as pd
+import numpy as np
+
+try:
+    import holidays
+    HAS_HOLIDAYS = True
+except ImportError:
+    HAS_HOLIDAYS = False
+
+# Key used for missing dates (NaT's integer representation)
+MISSING_DATE_KEY = np.iinfo(np.int64).min
+
+
+def date_key(dates):
+    """
+    Integer join key for a date column: days since 1970-01-01.
+    A plain cast, so computing it costs nothing compared to calendar attributes.
+    """
+    values = pd.to_datetime(pd.Series(dates), errors='coerce').values.astype('datetime64[D]')
+    return values.view(np.int64)
+
+
+def build_date_dimension(dates, countries=None):
+    """
+    Build one row per calendar day, from the Monday of the first posting week to the last posting.
+    Holds every calendar attribute the pipeline uses so they are computed once per day,
+    not once per transaction. Indexed by date_key.
+
+    countries: optional iterable of ISO country codes; adds is_holiday_<CC> flags plus an
+    'is_holiday' union flag (requires the 'holidays' package).
+    """
+    d = pd.to_datetime(pd.Series(dates), errors='coerce').dropna()
+    if d.empty:
+        return pd.DataFrame(index=pd.Index([], dtype=np.int64, name='date_key'))
+
+    first = d.min().normalize()
+    days = pd.date_range(first - pd.Timedelta(days=first.dayofweek), d.max().normalize(), freq='D')
+    iso = days.isocalendar()
+
+    dim = pd.DataFrame({'date': days})
+    dim['week'] = days.to_period('W').start_time
+    dim['month_start'] = days.to_period('M').start_time
+    dim['month_label'] = days.strftime('%Y-%m')
+    dim['Year'] = days.year
+    dim['Quarter'] = days.quarter
+    dim['Month'] = days.month
+    dim['Week_Num'] = iso['week'].values
+    dim['iso_year'] = iso['year'].values
+    # Calendar year + ISO week, as exported by the cleaner since the first version
+    dim['Fiscal_Week'] = dim['Year'].astype(str) + "-W" + dim['Week_Num'].astype(str).str.zfill(2)
+    # Dashboard label, e.g. "W7 '25"
+    dim['week_label'] = "W" + dim['Week_Num'].astype(str) + " '" + days.strftime('%y')
+    dim['day_of_week'] = days.dayofweek
+    dim['is_weekend'] = dim['day_of_week'].isin([5, 6])
+
+    if countries:
+        holiday_cols = []
+        if HAS_HOLIDAYS:
+            years = sorted(set(days.year))
+            for code in sorted(countries):
+                try:
+                    ctry = holidays.country_holidays(code, years=years)
+                except Exception:
+                    continue
+                col = f"is_holiday_{code}"
+                dim[col] = days.isin(pd.to_datetime(list(ctry.keys())))
+                holiday_cols.append(col)
+        dim['is_holiday'] = dim[holiday_cols].any(axis=1) if holiday_cols else False
+
+    dim.index = pd.Index(date_key(days), name='date_key')
+    return dim
+
+
+def lookup_calendar(dim, dates, columns):
+    """
+    Fetch calendar columns for a date column by date_key.
+    Returns a DataFrame aligned to `dates`; dates outside the dimension (or NaT) get NA.
+    """
+    dates = pd.Series(dates)
+    return lookup_calendar_by_key(dim, date_key(dates), columns, index=dates.index)
+
+
+def lookup_calendar_by_key(dim, keys, columns, index=None):
+    """Same as lookup_calendar for precomputed date keys (e.g. the time axis of an aggregate)."""
+    pos = dim.index.get_indexer(np.asarray(keys, dtype=np.int64))
+    has_missing = (pos < 0).any()
+
+    out = {}
+    for col in columns:
+        values = dim[col].values
+        if has_missing:
+            out[col] = pd.api.extensions.take(values, pos, allow_fill=True)
+        else:
+            out[col] = values[pos]
+    return pd.DataFrame(out, index=index)
+
+
+def attach_calendar(df, dim, columns, date_col='posting_date'):
+    """Join calendar columns onto df (in place) by date_key and return df."""
+    cal = lookup_calendar(dim, df[date_col], columns)
+    for col in columns:
+        df[col] = cal[col]
+    return df
@@ -0,0 +1,64 @@
+import numpy as np
+
+from feature_store import default_store
+
+# Feature layout per forecast origin: lag_1..lag_L, week_num, rolling mean/std, Fourier terms
+DEFAULT_LOOKBACK = 8
+DEFAULT_WINDOW = 4
+SEASON_WEEKS = 52
+
+
+def feature_names(lookback=DEFAULT_LOOKBACK):
+    """Column names of horizon_rows output."""
+    return [f'lag_{lag}' for lag in range(1, lookback + 1)] + \
+           ['week_num', 'rolling_mean_4', 'rolling_std_4', 'sin_week', 'cos_week',
+            'horizon', 'sin_target_week', 'cos_target_week']
+
+
+def origin_features(values, lookback=DEFAULT_LOOKBACK, window=DEFAULT_WINDOW, period=SEASON_WEEKS):
+    """
+    One feature row per forecast origin t (the last observed week), using only weeks <= t:
+    lags y[t], y[t-1], ..., the index of the next week (t + 1), rolling mean/std of the last
+    `window` weeks and annual Fourier terms of that week index.
+    Returns (X, origins); origins start at the first t with a full lookback and window.
+    Rows come from the shared feature store, so every caller sees identical features.
+    """
+    return default_store().series(values, lookback, window, period)
+
+
+def panel_origin_features(values, lookback=DEFAULT_LOOKBACK, window=DEFAULT_WINDOW, period=SEASON_WEEKS):
+    """origin_features for a (series x weeks) panel: (series x origins x features) and origins."""
+    return default_store().panel(values, lookback, window, period)
+
+
+def horizon_rows(X, origins, horizon, period=SEASON_WEEKS):
+    """
+    Expand each origin row into `horizon` rows (origin-major), appending the horizon h and
+    the Fourier terms of the target week t + h. One model then covers every horizon.
+    """
+    steps = np.arange(1, horizon + 1)
+    target_week = (np.asarray(origins)[:, None] + steps).ravel().astype(float)
+    return np.column_stack([
+        np.repeat(X, horizon, axis=0), np.tile(steps, len(X)).astype(float),
+        np.sin(2 * np.pi * target_week / period), np.cos(2 * np.pi * target_week / period)
+    ])
+
+
+def direct_training_set(values, horizon, lookback=DEFAULT_LOOKBACK, window=DEFAULT_WINDOW, period=SEASON_WEEKS):
+    """
+    (X, y) for a direct multi-horizon model: one row per (origin t, horizon h) with y = y[t + h].
+    Every observed target is used, so recent origins still train the short horizons.
+    """
+    y = np.asarray(values, dtype=float)
+    X, origins = origin_features(y, lookback, window, period)
+    rows = horizon_rows(X, origins, horizon, period)
+    target = (origins[:, None] + np.arange(1, horizon + 1)).ravel()
+    keep = target < len(y)
+    return rows[keep], y[target[keep]]
+
+
+def predict_horizons(model, X, origins, horizon, period=SEASON_WEEKS):
+    """Every horizon for every origin row of X in one predict call, as (origins x horizon)."""
+    X = np.atleast_2d(X)
+    pred = np.asarray(model.predict(horizon_rows(X, np.atleast_1d(origins), horizon, period)), dtype=float)
+    return pred.reshape(len(X), horizon)
@@ -0,0 +1,131 @@
+import pandas as pd
+import numpy as np
+
+# Defaults: amounts within $1 (rounding) posted up to 2 days apart
+DEFAULT_AMOUNT_TOL = 1.0
+DEFAULT_DAY_WINDOW = 2
+# Float slack so e.g. 100.30 vs 99.30 counts as within a $1 tolerance
+_EPS = 1e-9
+# Pairs at or above this similarity are reported as near-duplicates. With the defaults: amounts
+# within $0.66 on the same day, $0.44 one day apart or $0.22 two days apart. Weaker pairs are
+# kept as evidence (duplicate_score) but not flagged.
+NEAR_DUPLICATE_THRESHOLD = 0.6
+
+PAIR_COLUMNS = [
+    'row_a', 'row_b', 'DocumentNo_a', 'DocumentNo_b', 'Name', 'Curr.',
+    'date_a', 'date_b', 'amount_a', 'amount_b', 'amount_diff', 'day_gap',
+    'is_exact', 'similarity'
+]
+
+
+def _block_ids(df, cols):
+    """Dense integer id per distinct combination of the blocking columns (NaN is its own value)."""
+    if not cols:
+        return np.zeros(len(df), dtype=np.int64)
+    codes = [pd.factorize(df[c], use_na_sentinel=False)[0].astype(np.int64) for c in cols]
+    block = codes[0]
+    for c in codes[1:]:
+        block = block * (c.max() + 1) + c
+    return pd.factorize(block)[0].astype(np.int64)
+
+
+def find_duplicate_pairs(df, amount_tol=DEFAULT_AMOUNT_TOL, day_window=DEFAULT_DAY_WINDOW,
+                         entity_col='Name', currency_col='Curr.', amount_col='Amount in USD',
+                         date_col='posting_date', doc_col='DocumentNo'):
+    """
+    Candidate duplicate payments: same entity and currency, |amount difference| <= amount_tol,
+    posted at most day_window days apart. Returns one row of evidence per pair (PAIR_COLUMNS),
+    with row_a/row_b as positions in df.
+
+    Blocking: rows are grouped by (entity, currency, amount bucket of width amount_tol).
+    A pair within tolerance sits in the same or the neighbouring bucket, so every row is also
+    probed against the bucket below. Inside a block rows are sorted by date and each row is only
+    compared with the rows inside its date window (found with searchsorted), so the cost is
+    O(n log n) plus the number of candidates, never O(n^2).
+    """
+    amounts = pd.to_numeric(df[amount_col], errors='coerce').to_numpy(dtype=float)
+    days = pd.to_datetime(df[date_col], errors='coerce').to_numpy().astype('datetime64[D]').view(np.int64)
+    valid = ~np.isnan(amounts) & (days != np.iinfo(np.int64).min)
+    if not valid.any():
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+
+    block_cols = [c for c in [entity_col, currency_col] if c in df.columns]
+    entity_block = _block_ids(df, block_cols)
+
+    rows = np.flatnonzero(valid)
+    if amount_tol > 0:
+        bucket = np.floor(amounts[rows] / amount_tol).astype(np.int64)
+        # Home copy in its own bucket + probe copy in the bucket below
+        rec = np.concatenate([rows, rows])
+        rec_bucket = np.concatenate([bucket, bucket - 1])
+        is_probe = np.concatenate([np.zeros(len(rows), bool), np.ones(len(rows), bool)])
+    else:
+        # Exact amounts only: the amount itself is the bucket
+        rec = rows
+        rec_bucket = pd.factorize(amounts[rows])[0].astype(np.int64)
+        is_probe = np.zeros(len(rows), bool)
+
+    block = pd.factorize(pd.MultiIndex.from_arrays([entity_block[rec], rec_bucket]))[0].astype(np.int64)
+
+    # Sort by (block, day); each record's window is [i+1, end) in that order
+    order = np.lexsort((days[rec], block))
+    rec, block, is_probe = rec[order], block[order], is_probe[order]
+    rec_days = days[rec]
+
+    # Composite sort key so one searchsorted finds the end of every window
+    span = int(rec_days.max() - rec_days.min()) + day_window + 2
+    key = block * span + (rec_days - rec_days.min())
+    end = np.searchsorted(key, key + day_window, side='right')
+    counts = end - np.arange(len(key)) - 1
+    if counts.sum() == 0:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+
+    # Expand windows into candidate index pairs without a Python loop
+    i = np.repeat(np.arange(len(key)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    j = i + offsets
+
+    # Probe copies only pair with home copies; drop self pairs and out-of-tolerance amounts
+    a, b = rec[i], rec[j]
+    keep = ~(is_probe[i] & is_probe[j]) & (a != b)
+    a, b = a[keep], b[keep]
+    diff = np.abs(amounts[a] - amounts[b])
+    keep = diff <= amount_tol + _EPS
+    a, b, diff = a[keep], b[keep], diff[keep]
+
+    # Canonical order + dedupe (a pair can be found via both the home and the probe bucket)
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    pair_key = np.unique(np.stack([lo, hi], axis=1), axis=0)
+    if len(pair_key) == 0:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    a, b = pair_key[:, 0], pair_key[:, 1]
+    diff = np.abs(amounts[a] - amounts[b])
+    gap = np.abs(days[a] - days[b])
+
+    # Similarity: 1.0 for an exact match, decaying with amount and date distance
+    amount_sim = np.clip(1 - diff / amount_tol, 0, 1) if amount_tol > 0 else np.ones(len(a))
+    date_sim = 1 - gap / (day_window + 1)
+    similarity = np.round(0.6 * amount_sim + 0.4 * date_sim, 4)
+
+    def col(name, idx):
+        return df[name].to_numpy()[idx] if name in df.columns else np.full(len(idx), None)
+
+    return pd.DataFrame({
+        'row_a': a, 'row_b': b,
+        'DocumentNo_a': col(doc_col, a), 'DocumentNo_b': col(doc_col, b),
+        'Name': col(entity_col, a), 'Curr.': col(currency_col, a),
+        'date_a': df[date_col].to_numpy()[a], 'date_b': df[date_col].to_numpy()[b],
+        'amount_a': amounts[a], 'amount_b': amounts[b],
+        'amount_diff': diff, 'day_gap': gap,
+        'is_exact': (diff == 0) & (gap == 0),
+        'similarity': similarity
+    }).sort_values(['similarity', 'amount_a'], ascending=[False, True]).reset_index(drop=True)
+
+
+def duplicate_scores(n_rows, pairs):
+    """Best pair similarity per row (0 where a row is in no candidate pair)."""
+    scores = np.zeros(n_rows)
+    if len(pairs):
+        np.maximum.at(scores, pairs['row_a'].to_numpy(dtype=np.int64), pairs['similarity'].to_numpy())
+        np.maximum.at(scores, pairs['row_b'].to_numpy(dtype=np.int64), pairs['similarity'].to_numpy())
+    return scores
@@ -0,0 +1,116 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Feature rows cached per series (content hash + layout); oldest dropped first
+MAX_CACHED_SERIES = 4096
+
+
+def lag_matrix(values, lookback):
+    """
+    (series x origins x lookback) view of lags y[t], y[t-1], ... for every origin t >= lookback - 1.
+    Strided view of the panel: no copy until the caller stacks it.
+    """
+    return sliding_window_view(values, lookback, axis=1)[:, :, ::-1]
+
+
+def rolling_mean_std(values, window):
+    """
+    Rolling mean and sample std (ddof=1) of the last `window` weeks for every t >= window - 1,
+    from cumulative sums of y and y**2 along the time axis: O(T) per series for any window.
+    Series are centred first so the sums stay small relative to the variance.
+    """
+    centre = values.mean(axis=1, keepdims=True) if values.shape[1] else 0.0
+    y = values - centre
+    zeros = np.zeros((len(y), 1))
+    c1 = np.concatenate([zeros, np.cumsum(y, axis=1)], axis=1)
+    c2 = np.concatenate([zeros, np.cumsum(y * y, axis=1)], axis=1)
+    s1 = c1[:, window:] - c1[:, :-window]
+    s2 = c2[:, window:] - c2[:, :-window]
+    mean = s1 / window
+    var = np.maximum(s2 - s1 * mean, 0.0) / max(window - 1, 1)
+    return mean + centre, np.sqrt(var)
+
+
+def panel_features(values, lookback, window, period):
+    """
+    Origin features for a whole panel at once. values: (series x weeks), all series aligned.
+    Returns (X, origins) with X (series x origins x lookback + 5): lags, week index of the next
+    week, rolling mean/std and annual Fourier terms of that week.
+    """
+    y = np.atleast_2d(np.asarray(values, dtype=float))
+    n_series, n_weeks = y.shape
+    first = max(lookback, window) - 1
+    if n_weeks <= first:
+        return np.empty((n_series, 0, lookback + 5)), np.empty(0, dtype=np.int64)
+
+    origins = np.arange(first, n_weeks)
+    lags = lag_matrix(y, lookback)[:, first - lookback + 1:]
+    mean, std = rolling_mean_std(y, window)
+    mean, std = mean[:, first - window + 1:], std[:, first - window + 1:]
+    week = (origins + 1).astype(float)
+    calendar = np.column_stack([week, np.sin(2 * np.pi * week / period), np.cos(2 * np.pi * week / period)])
+    calendar = np.broadcast_to(calendar, (n_series,) + calendar.shape)
+    X = np.concatenate([lags, calendar[:, :, :1], mean[:, :, None], std[:, :, None], calendar[:, :, 1:]], axis=2)
+    return X, origins
+
+
+class FeatureStore:
+    """
+    Origin feature rows shared by training, backtesting and inference. Each series is keyed by
+    a hash of its values and the feature layout, so fitting, tuning and forecasting from the
+    same history build its features only once. Panels are looked up series by series and all
+    misses are built together in one vectorised panel_features call.
+    """
+    def __init__(self, max_series=MAX_CACHED_SERIES):
+        self.max_series = max_series
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+
+    @staticmethod
+    def _key(y, layout):
+        h = hashlib.sha256(np.ascontiguousarray(y).tobytes())
+        h.update(repr((y.shape, layout)).encode('utf-8'))
+        return h.hexdigest()
+
+    def panel(self, values, lookback, window, period):
+        """(series x origins x features) array and origins for a (series x weeks) panel."""
+        y = np.atleast_2d(np.asarray(values, dtype=float))
+        layout = (lookback, window, period)
+        keys = [self._key(row, layout) for row in y]
+        missing = [i for i, key in enumerate(keys) if key not in self._cache]
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            built, _ = panel_features(y[missing], lookback, window, period)
+            for i, X in zip(missing, built):
+                X.flags.writeable = False
+                self._cache[keys[i]] = X
+            self.builds += len(missing)
+
+        origins = np.arange(max(lookback, window) - 1, y.shape[1])
+        X = np.stack([self._cache[key] for key in keys])
+        for key in keys:
+            self._cache.move_to_end(key)
+        while len(self._cache) > self.max_series:
+            self._cache.popitem(last=False)
+        return X, origins
+
+    def series(self, values, lookback, window, period):
+        """(origins x features) array and origins for one series."""
+        X, origins = self.panel(np.asarray(values, dtype=float)[None, :], lookback, window, period)
+        return X[0], origins
+
+
+_default = None
+
+
+def default_store():
+    """Process-wide feature store."""
+    global _default
+    if _default is None:
+        _default = FeatureStore()
+    return _default
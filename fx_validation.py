@@ -0,0 +1,99 @@
+import pandas as pd
+import numpy as np
+
+# Column names that may carry an effective date in the 'Others - Exchange Rate' sheet
+RATE_DATE_COLUMNS = ['Date', 'Effective Date', 'Valid From', 'Rate Date', 'As Of']
+
+
+def prepare_rate_table(df_fx, code_col='Code', rate_col='Rate (USD)'):
+    """
+    Normalise the exchange rate sheet to [Code, Sheet_Rate_USD(, rate_date)].
+    A rate_date column is kept when the sheet provides one, which enables as-of joins.
+    """
+    if df_fx is None or code_col not in df_fx.columns or rate_col not in df_fx.columns:
+        return None
+
+    rates = pd.DataFrame({
+        'Code': df_fx[code_col].astype(str).str.strip(),
+        'Sheet_Rate_USD': pd.to_numeric(df_fx[rate_col], errors='coerce')
+    })
+
+    date_col = next((c for c in RATE_DATE_COLUMNS if c in df_fx.columns), None)
+    if date_col is not None:
+        rates['rate_date'] = pd.to_datetime(df_fx[date_col], errors='coerce')
+        rates = rates.dropna(subset=['rate_date'])
+
+    return rates.dropna(subset=['Sheet_Rate_USD'])
+
+
+def lookup_sheet_rates(df, rates, currency_col='Curr.', date_col='posting_date'):
+    """
+    Return the sheet rate for every transaction, aligned to df.index.
+    - Single rate per currency: a hash lookup (no row duplication like a merge on 'Code').
+    - Dated rate table: a sorted as-of merge, so each posting uses the latest rate
+      effective on its date. Postings before the first rate (or without a date)
+      fall back to the earliest / latest known rate respectively.
+    """
+    currency = df[currency_col].astype(str).str.strip()
+
+    if 'rate_date' not in rates.columns or not rates['Code'].duplicated().any():
+        latest = rates.drop_duplicates('Code', keep='last').set_index('Code')['Sheet_Rate_USD']
+        return pd.Series(currency.map(latest).values, index=df.index, dtype=float)
+
+    rates = rates.sort_values('rate_date')
+    latest = rates.drop_duplicates('Code', keep='last').set_index('Code')['Sheet_Rate_USD']
+    earliest = rates.drop_duplicates('Code', keep='first').set_index('Code')['Sheet_Rate_USD']
+
+    result = pd.Series(np.nan, index=df.index, dtype=float)
+    dates = pd.to_datetime(df[date_col], errors='coerce') if date_col in df.columns else pd.Series(pd.NaT, index=df.index)
+    has_date = dates.notna()
+
+    if has_date.any():
+        left = pd.DataFrame({'_row': np.flatnonzero(has_date.values), 'Code': currency[has_date].values, 'rate_date': dates[has_date].values})
+        left = left.sort_values('rate_date')
+        joined = pd.merge_asof(left, rates, on='rate_date', by='Code', direction='backward')
+        # Before the first effective date -> use the earliest rate for that currency
+        joined['Sheet_Rate_USD'] = joined['Sheet_Rate_USD'].fillna(joined['Code'].map(earliest))
+        values = result.values.copy()
+        values[joined['_row'].values] = joined['Sheet_Rate_USD'].values
+        result = pd.Series(values, index=df.index)
+
+    if (~has_date).any():
+        result[~has_date] = currency[~has_date].map(latest).values
+
+    return result
+
+
+def implied_fx_rate(amount_usd, amount_doc):
+    """
+    |USD / doc| as one array operation. Zero document amounts yield 0 (not inf),
+    missing inputs propagate as NaN, matching the previous row-wise apply.
+    """
+    usd = np.asarray(amount_usd, dtype=float)
+    doc = np.asarray(amount_doc, dtype=float)
+    nonzero = doc != 0
+    out = np.zeros_like(usd)
+    np.divide(usd, doc, out=out, where=nonzero)
+    return np.abs(out)
+
+
+def add_fx_validation_columns(df, df_fx, currency_col='Curr.', date_col='posting_date', log=print):
+    """
+    Adds Sheet_Rate_USD, implied_fx_rate and fx_rate_variance to df (in place) and returns it.
+    Returns df unchanged with a warning if the rate sheet or required columns are missing.
+    """
+    rates = prepare_rate_table(df_fx)
+    required = [currency_col, 'Amount in USD', 'Amount in doc. curr.']
+    if rates is None or not all(c in df.columns for c in required):
+        log("  • Warning: Could not map Exchange Rate columns (Missing 'Code' or 'Rate (USD)').")
+        return df
+
+    if 'rate_date' in rates.columns and rates['Code'].duplicated().any():
+        log("  • Joining dated Exchange Rates (as-of posting date)...")
+    else:
+        log("  • Merging Provided Exchange Rates (from Excel)...")
+
+    df['Sheet_Rate_USD'] = lookup_sheet_rates(df, rates, currency_col=currency_col, date_col=date_col)
+    df['implied_fx_rate'] = implied_fx_rate(df['Amount in USD'], df['Amount in doc. curr.'])
+    df['fx_rate_variance'] = df['implied_fx_rate'] - df['Sheet_Rate_USD']
+    return df
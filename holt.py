@@ -0,0 +1,212 @@
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Default search grid: 0.05 steps, a superset of the original 5 x 4 grid
+DEFAULT_ALPHAS = np.round(np.arange(0.05, 1.0, 0.05), 2)
+DEFAULT_BETAS = np.round(np.arange(0.05, 0.55, 0.05), 2)
+# Parameters used when a series is too short to tune
+FALLBACK_PARAMS = (0.3, 0.2)
+
+
+def holt_recursion(values, alphas, betas, return_path=False, return_trend_path=False):
+    """
+    Holt's linear trend recursion for many series and many (alpha, beta) pairs at once.
+    values: (series x time) matrix (a 1-D series is treated as one row).
+    alphas/betas: (series x pairs) arrays, or 1-D arrays of pairs shared by every series.
+    The loop runs over time only; each step updates every series and pair as one array operation.
+    Returns final (level, trend) as (series x pairs), plus the (series x pairs x time) level path
+    with return_path=True (and the trend path after it with return_trend_path=True).
+    Starts from level = first value, trend = 0.
+    """
+    y = np.atleast_2d(np.asarray(values, dtype=float))
+    a = np.asarray(alphas, dtype=float)
+    b = np.asarray(betas, dtype=float)
+    if a.ndim == 1:
+        a = np.broadcast_to(a, (len(y), len(a)))
+        b = np.broadcast_to(b, (len(y), len(b)))
+
+    level = np.repeat(y[:, :1], a.shape[1], axis=1)
+    trend = np.zeros(a.shape)
+    path = np.empty(a.shape + (y.shape[1],)) if return_path else None
+    trend_path = np.empty(a.shape + (y.shape[1],)) if return_trend_path else None
+
+    for t in range(y.shape[1]):
+        value = y[:, t:t + 1]
+        new_level = a * value + (1 - a) * (level + trend)
+        trend = b * (new_level - level) + (1 - b) * trend
+        level = new_level
+        if return_path:
+            path[..., t] = level
+        if return_trend_path:
+            trend_path[..., t] = trend
+
+    out = (level, trend)
+    if return_path:
+        out += (path,)
+    if return_trend_path:
+        out += (trend_path,)
+    return out
+
+
+def _validation_rmse(y, a, b, horizon):
+    """RMSE of level + h * trend over the last `horizon` points, for (series x pairs) parameters."""
+    train, valid = y[:, :-horizon], y[:, -horizon:]
+    level, trend = holt_recursion(train, a, b)
+    steps = np.arange(1, horizon + 1)
+    preds = level[..., None] + trend[..., None] * steps
+    return np.sqrt(np.mean((valid[:, None, :] - preds) ** 2, axis=2))
+
+
+def optimize_holt_batch(values, alphas=DEFAULT_ALPHAS, betas=DEFAULT_BETAS, horizon=4, refine=0):
+    """
+    Best (alpha, beta) per series by validation RMSE (fit on all but the last `horizon` points).
+    Every series is searched over the full grid in one recursion; refine > 0 then zooms in
+    `refine` times on a same-size grid around each series' current best (bounded to (0, 1)).
+    Ties go to the first minimum in alpha-major order, like a nested alpha/beta loop.
+    Returns (alpha, beta, rmse) arrays per series and the (series x alpha x beta) error surface
+    of the full grid. Series shorter than 2 * horizon keep FALLBACK_PARAMS.
+    """
+    y = np.atleast_2d(np.asarray(values, dtype=float))
+    alphas = np.asarray(alphas, dtype=float)
+    betas = np.asarray(betas, dtype=float)
+    n = len(y)
+    best_alpha = np.full(n, FALLBACK_PARAMS[0])
+    best_beta = np.full(n, FALLBACK_PARAMS[1])
+    best_rmse = np.full(n, np.nan)
+    if y.shape[1] < 2 * horizon:
+        return best_alpha, best_beta, best_rmse, np.full((n, len(alphas), len(betas)), np.nan)
+
+    grid_a = np.broadcast_to(np.repeat(alphas, len(betas)), (n, len(alphas) * len(betas)))
+    grid_b = np.broadcast_to(np.tile(betas, len(alphas)), (n, len(alphas) * len(betas)))
+    err = _validation_rmse(y, grid_a, grid_b, horizon)
+    surface = err.reshape(n, len(alphas), len(betas))
+
+    da = np.diff(alphas).min() if len(alphas) > 1 else 0.05
+    db = np.diff(betas).min() if len(betas) > 1 else 0.05
+    rows = np.arange(n)
+    for step in range(refine + 1):
+        scored = np.where(np.isnan(err), np.inf, err)
+        pick = scored.argmin(axis=1)
+        found = np.isfinite(scored[rows, pick])
+        better = found & ~(scored[rows, pick] >= best_rmse)   # NaN best_rmse counts as "better"
+        best_alpha = np.where(better, grid_a[rows, pick], best_alpha)
+        best_beta = np.where(better, grid_b[rows, pick], best_beta)
+        best_rmse = np.where(better, scored[rows, pick], best_rmse)
+        if step == refine:
+            break
+        # Next grid per series: same resolution, one cell either side of its current best
+        fine_a = np.clip(np.linspace(best_alpha - da, best_alpha + da, len(alphas), axis=1), 1e-4, 1 - 1e-4)
+        fine_b = np.clip(np.linspace(best_beta - db, best_beta + db, len(betas), axis=1), 1e-4, 1 - 1e-4)
+        da, db = 2 * da / max(len(alphas) - 1, 1), 2 * db / max(len(betas) - 1, 1)
+        grid_a = np.repeat(fine_a, len(betas), axis=1)
+        grid_b = np.tile(fine_b, (1, len(alphas)))
+        err = _validation_rmse(y, grid_a, grid_b, horizon)
+
+    return best_alpha, best_beta, best_rmse, surface
+
+
+def optimize_holt(values, alphas=DEFAULT_ALPHAS, betas=DEFAULT_BETAS, horizon=4, refine=0):
+    """
+    Single-series optimize_holt_batch. Returns (alpha, beta, rmse, surface) with the error surface
+    as a DataFrame (alpha rows x beta columns); empty for series too short to tune.
+    """
+    a, b, rmse, surface = optimize_holt_batch(values, alphas, betas, horizon, refine)
+    if np.isnan(surface).all():
+        return float(a[0]), float(b[0]), float(rmse[0]), pd.DataFrame()
+    frame = pd.DataFrame(surface[0], index=pd.Index(np.asarray(alphas, dtype=float), name='alpha'),
+                         columns=pd.Index(np.asarray(betas, dtype=float), name='beta'))
+    return float(a[0]), float(b[0]), float(rmse[0]), frame
+
+
+def holt_forecast_batch(values, alphas, betas, short_horizon=4, long_horizon=24, change_window=8,
+                        damping=0.97, noise_scale=0.6, seed=42, seeds=None):
+    """
+    Fit and forecast every row of a (series x weeks) matrix in lockstep, one parameter pair per row.
+    Returns a dict of arrays:
+      fitted (series x weeks) smoothed levels, level / trend (series,),
+      short (series x short_horizon): last level + the last `change_window` weekly changes, cycled,
+      long (series x long_horizon): damped trend + noise of noise_scale x the series' std.
+        The noise draws come from one seeded stream shared by every row, which is exactly
+        what re-seeding the global RNG before each series used to produce. With `seeds`
+        (one per row, see series_seed) every row draws from its own stream instead.
+      long_mean (series x long_horizon): the long forecast without the noise,
+      residuals (series x weeks-1): one-step-ahead errors y[t] - (level[t-1] + trend[t-1]),
+      mae / rmse (series,): last 8 weeks against a 4-week moving-average baseline.
+    """
+    y = np.atleast_2d(np.asarray(values, dtype=float))
+    n, t = y.shape
+    level, trend, path, trend_path = holt_recursion(y, np.asarray(alphas, dtype=float)[:, None],
+                                                    np.asarray(betas, dtype=float)[:, None],
+                                                    return_path=True, return_trend_path=True)
+    level, trend, fitted = level[:, 0], trend[:, 0], path[:, 0, :]
+    residuals = y[:, 1:] - (fitted[:, :-1] + trend_path[:, 0, :-1])
+
+    # Short horizon: replay the recent weekly changes
+    changes = np.diff(y, axis=1)[:, -change_window:]
+    if changes.shape[1] < 2:
+        changes = np.zeros((n, 2))
+    cycled = changes[:, np.arange(short_horizon) % changes.shape[1]]
+    short = np.cumsum(np.hstack([level[:, None], cycled]), axis=1)[:, 1:]
+
+    # Long horizon: damped trend + seeded noise
+    std = pd.DataFrame(y.T).std().to_numpy() if t > 1 else np.abs(level) * 0.1
+    if seeds is None:
+        noise = np.random.RandomState(seed).standard_normal(long_horizon)
+    else:
+        noise = np.array([np.random.RandomState(s).standard_normal(long_horizon) for s in seeds]).reshape(n, long_horizon)
+    steps = trend[:, None] * damping ** np.arange(long_horizon)
+    long_mean = np.cumsum(np.hstack([level[:, None], steps]), axis=1)[:, 1:]
+    long = long_mean + (std * noise_scale)[:, None] * noise
+
+    # Accuracy vs a 4-week moving average (same window as before)
+    mae = np.zeros(n)
+    rmse = np.zeros(n)
+    if t > 8:
+        baseline = pd.DataFrame(y.T).rolling(window=4).mean().shift(1).to_numpy().T
+        diff = y[:, -8:] - baseline[:, -8:]
+        mae = np.mean(np.abs(diff), axis=1)
+        rmse = np.sqrt(np.mean(diff ** 2, axis=1))
+
+    return {'fitted': fitted, 'level': level, 'trend': trend, 'short': short, 'long': long,
+            'long_mean': long_mean, 'residuals': residuals, 'mae': mae, 'rmse': rmse}
+
+
+def series_seed(name, base_seed=42):
+    """Stable RNG seed for one series, from its name (same in every process, shard and run)."""
+    digest = hashlib.sha256(f"{base_seed}:{name}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'little')
+
+
+def _forecast_shard(values, seeds, refine):
+    """Worker: tune and forecast one block of rows."""
+    alphas, betas, _, surfaces = optimize_holt_batch(values, refine=refine)
+    return alphas, betas, surfaces, holt_forecast_batch(values, alphas, betas, seeds=seeds)
+
+
+def forecast_series_parallel(values, seeds, max_workers=None, shard_rows=64, refine=1):
+    """
+    Tune and forecast a (series x weeks) matrix split into row shards of shard_rows,
+    one shard per task on a process pool. Each row uses its own seed, so the result does
+    not depend on how rows are sharded or scheduled. Returns (alphas, betas, surfaces,
+    forecast dict), the rows concatenated back in input order.
+    """
+    y = np.atleast_2d(np.asarray(values, dtype=float))
+    seeds = list(seeds)
+    bounds = [(i, min(i + shard_rows, len(y))) for i in range(0, len(y), shard_rows)]
+    workers = min(len(bounds), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        parts = [_forecast_shard(y[lo:hi], seeds[lo:hi], refine) for lo, hi in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_forecast_shard, y[lo:hi], seeds[lo:hi], refine) for lo, hi in bounds]
+            parts = [f.result() for f in futures]
+
+    alphas = np.concatenate([p[0] for p in parts])
+    betas = np.concatenate([p[1] for p in parts])
+    surfaces = np.concatenate([p[2] for p in parts])
+    fc = {k: np.concatenate([p[3][k] for p in parts]) for k in parts[0][3]}
+    return alphas, betas, surfaces, fc
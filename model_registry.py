@@ -0,0 +1,129 @@
+import os
+import json
+import pickle
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import joblib
+    HAS_JOBLIB = True
+except ImportError:
+    HAS_JOBLIB = False
+
+# Fitted models on disk: <root>/<model name>/<version>.joblib + <version>.json
+REGISTRY_DIR = '.cache/models'
+# Fitted models kept in memory per process (least recently used are dropped first)
+MAX_MODELS_IN_MEMORY = 8
+
+
+def data_hash(*arrays):
+    """Content hash of the training data (shapes, dtypes and values)."""
+    h = hashlib.sha256()
+    for arr in arrays:
+        if arr is None:
+            continue
+        arr = np.ascontiguousarray(arr)
+        h.update(f"{arr.shape}|{arr.dtype}|".encode('utf-8'))
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def _params_of(estimator):
+    """Hyperparameters of an estimator as a JSON-safe dict."""
+    params = estimator.get_params() if hasattr(estimator, 'get_params') else {}
+    return {k: v if isinstance(v, (int, float, str, bool, type(None))) else repr(v) for k, v in sorted(params.items())}
+
+
+class ModelRegistry:
+    """
+    Versioned store of fitted models. A version is the hash of (model name, training data
+    hash, feature schema, hyperparameters), so a model is reused exactly when it would be
+    refitted on the same data, features and settings. Models are read from disk lazily, on
+    first request, and at most max_in_memory of them stay loaded (LRU).
+    """
+    def __init__(self, root=REGISTRY_DIR, max_in_memory=MAX_MODELS_IN_MEMORY):
+        self.root = root
+        self.max_in_memory = max_in_memory
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.fits = 0
+
+    @staticmethod
+    def version(name, data_digest, schema, params):
+        key = json.dumps([name, data_digest, list(schema), params], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]
+
+    def _path(self, name, version, ext):
+        slug = ''.join(ch if ch.isalnum() else '_' for ch in name)
+        return os.path.join(self.root, slug, f"{version}.{ext}")
+
+    def _remember(self, version, model):
+        self._memory[version] = model
+        self._memory.move_to_end(version)
+        while len(self._memory) > self.max_in_memory:
+            self._memory.popitem(last=False)
+
+    def load(self, name, version):
+        """The fitted model for `version`, or None if it was never saved."""
+        if version in self._memory:
+            self._memory.move_to_end(version)
+            return self._memory[version]
+        path = self._path(name, version, 'joblib')
+        if not os.path.exists(path):
+            return None
+        try:
+            if HAS_JOBLIB:
+                model = joblib.load(path)
+            else:
+                with open(path, 'rb') as f:
+                    model = pickle.load(f)
+        except Exception:
+            return None
+        self._remember(version, model)
+        return model
+
+    def save(self, name, version, model, metadata):
+        path = self._path(name, version, 'joblib')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        if HAS_JOBLIB:
+            joblib.dump(model, tmp)
+        else:
+            with open(tmp, 'wb') as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        with open(self._path(name, version, 'json'), 'w', encoding='utf-8') as f:
+            json.dump(dict(metadata, created=datetime.now().isoformat(timespec='seconds')), f, indent=2, default=str)
+        self._remember(version, model)
+
+    def fit_or_load(self, name, estimator, X, y=None, schema=None):
+        """
+        A fitted copy of `estimator` for (X, y): loaded when a compatible version exists,
+        otherwise fitted and registered. Returns (model, loaded).
+        """
+        schema = list(schema) if schema is not None else [f"x{i}" for i in range(np.shape(X)[1])]
+        params = _params_of(estimator)
+        digest = data_hash(X, y)
+        version = self.version(name, digest, schema, params)
+        model = self.load(name, version)
+        if model is not None:
+            self.hits += 1
+            return model, True
+        estimator.fit(X, y) if y is not None else estimator.fit(X)
+        self.fits += 1
+        self.save(name, version, estimator, {'name': name, 'data_hash': digest, 'schema': schema, 'params': params})
+        return estimator, False
+
+
+_default = None
+
+
+def default_registry():
+    """Process-wide registry (one LRU cache per process)."""
+    global _default
+    if _default is None:
+        _default = ModelRegistry()
+    return _default
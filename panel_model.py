@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from direct_forecast import DEFAULT_LOOKBACK, panel_origin_features, horizon_rows
+
+try:
+    from xgboost import XGBRegressor
+    HAS_XGBOOST = True
+except ImportError:
+    from sklearn.ensemble import GradientBoostingRegressor
+    HAS_XGBOOST = False
+
+DEFAULT_PANEL_PARAMS = {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.1}
+
+
+class GlobalPanelForecaster:
+    """
+    One gradient-boosted direct multi-horizon model for a whole panel of weekly series
+    (e.g. every Name x Category x Activity combination), instead of one model per series.
+
+    Each series is scaled by its mean absolute weekly flow, then contributes (origin, horizon)
+    rows built like direct_forecast: lags, rolling stats, Fourier terms and the horizon, plus
+    a series id and one integer code per hierarchy level. Origins before a series' first
+    non-zero week are skipped, so young series still train (and get) forecasts from the
+    shared model. Forecasting every series is a single predict call.
+    """
+    def __init__(self, horizon=24, lookback=DEFAULT_LOOKBACK, params=None):
+        self.horizon = horizon
+        self.lookback = lookback
+        self.params = dict(params or DEFAULT_PANEL_PARAMS)
+        self.model = None
+
+    def _codes(self, columns):
+        """series id + one code per hierarchy level, (series x levels)."""
+        ids = np.arange(len(columns))
+        if isinstance(columns, pd.MultiIndex):
+            levels = [pd.factorize(columns.get_level_values(i))[0] for i in range(columns.nlevels)]
+        else:
+            levels = []
+        return np.column_stack([ids] + levels).astype(float)
+
+    def fit(self, panel):
+        """panel: DataFrame (weeks x series), columns optionally a MultiIndex hierarchy."""
+        self.columns = panel.columns
+        self.index = panel.index
+        codes = self._codes(panel.columns)
+        values = panel.to_numpy(dtype=float)
+        n_weeks = len(values)
+
+        # Scaled features of every series in one panel pass, plus the series/hierarchy codes
+        scales = np.abs(values).mean(axis=0)
+        self._scales = np.where(scales > 0, scales, 1.0)
+        scaled = (values / self._scales).T
+        X3, origins = panel_origin_features(scaled, self.lookback)
+        X3 = np.concatenate([X3, np.broadcast_to(codes[:, None, :], X3.shape[:2] + codes.shape[1:])], axis=2)
+        self._last_rows = X3[:, -1]
+        self._last_origins = np.full(len(X3), origins[-1])
+
+        # Origins from each series' first non-zero week, expanded to (origin, horizon) rows
+        active = values != 0
+        start = np.where(active.any(axis=0), active.argmax(axis=0), n_weeks)
+        keep_origin = origins[None, :] >= start[:, None]
+        series_idx, origin_idx = np.nonzero(keep_origin)
+        rows = horizon_rows(X3[series_idx, origin_idx], origins[origin_idx], self.horizon)
+        target = (origins[origin_idx][:, None] + np.arange(1, self.horizon + 1)).ravel()
+        keep = target < n_weeks
+        X_train = rows[keep]
+        y_train = scaled[np.repeat(series_idx, self.horizon)[keep], target[keep]]
+
+        if HAS_XGBOOST:
+            self.model = XGBRegressor(**self.params, random_state=42, verbosity=0)
+        else:
+            self.model = GradientBoostingRegressor(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42)
+        self.model.fit(X_train, y_train)
+        self.n_train_rows = len(y_train)
+        return self
+
+    def predict(self):
+        """(series x horizon) forecasts from the last observed week, in one batched predict."""
+        X = self._last_rows
+        rows = horizon_rows(X, self._last_origins, self.horizon)
+        pred = np.asarray(self.model.predict(rows), dtype=float).reshape(len(X), self.horizon)
+        pred *= self._scales[:, None]
+        dates = pd.date_range(start=self.index[-1] + pd.Timedelta(days=1), periods=self.horizon, freq='W-MON')
+        return pd.DataFrame(pred, index=self.columns, columns=dates)
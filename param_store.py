@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+# Tuned hyperparameters per series, next to the pipeline artifacts
+PARAM_STORE_PATH = '.cache/hyperparams.json'
+# Retune when the stored parameters are older than this ...
+RETUNE_AFTER_DAYS = 7
+# ... or when their backtest MAE got this much worse (relative) than when they were tuned
+DRIFT_THRESHOLD = 0.25
+
+
+def series_fingerprint(series):
+    """Content hash of a weekly series (dates and values)."""
+    h = hashlib.sha256()
+    h.update(np.asarray(series.index.astype('int64')).tobytes())
+    h.update(np.asarray(series.to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+class ParamStore:
+    """
+    Best hyperparameters per series identity (e.g. 'xgboost:total'), with the fingerprint of
+    the data they were tuned on, when they were tuned and the backtest MAE they reached.
+    Kept as one small JSON file.
+    """
+    def __init__(self, path=PARAM_STORE_PATH):
+        self.path = path
+        self._entries = None
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    self._entries = {}
+        return self._entries
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, params, fingerprint, mae):
+        self.entries[key] = {
+            'params': params,
+            'fingerprint': fingerprint,
+            'tuned_at': datetime.now().isoformat(timespec='seconds'),
+            'mae': float(mae)
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def tuning_reason(self, key, fingerprint, mae=None, retune_after_days=RETUNE_AFTER_DAYS, drift=DRIFT_THRESHOLD):
+        """
+        Why `key` should be retuned, or None to keep its stored parameters.
+        Same data fingerprint: never. Otherwise when the entry is missing, older than
+        retune_after_days, or the current backtest `mae` drifted past drift x the tuned MAE.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return "no stored parameters"
+        if entry['fingerprint'] == fingerprint:
+            return None
+        age = (datetime.now() - datetime.fromisoformat(entry['tuned_at'])).days
+        if age >= retune_after_days:
+            return f"parameters are {age} days old"
+        if mae is not None and entry['mae'] > 0 and mae > entry['mae'] * (1 + drift):
+            return f"backtest MAE drifted {mae / entry['mae'] - 1:+.0%}"
+        return None
@@ -0,0 +1,333 @@
+import os
+import io
+import re
+import sys
+import pickle
+import hashlib
+import inspect
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Local artifact store for stage outputs (see Pipeline)
+ARTIFACT_DIR = '.cache/artifacts'
+
+
+class Stage:
+    """
+    One pipeline step: a method of the target object, the attributes it reads (inputs) and
+    writes (outputs), and any files it writes. params are extra values that change its result.
+    Stages with cache=False always run (e.g. cheap loaders).
+    """
+    def __init__(self, name, method, inputs=(), outputs=(), files=(), params=None, cache=True):
+        self.name = name
+        self.method = method
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.files = list(files)
+        self.params = params or {}
+        self.cache = cache
+
+    def with_params(self, **params):
+        """Copy of this stage with extra params (they are part of its cache key)."""
+        return Stage(self.name, self.method, self.inputs, self.outputs, self.files,
+                     dict(self.params, **params), self.cache)
+
+
+def _module_file(obj, root):
+    """Source file of the module defining obj, if it is a project module under root."""
+    module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+    path = getattr(module, '__file__', None)
+    if path and os.path.dirname(os.path.realpath(path)) == root:
+        return module, os.path.realpath(path)
+    return None, None
+
+
+def _project_files(module, names, root):
+    """
+    Project files behind the given global names of module, plus (transitively) every project
+    module those files import, e.g. direct_forecast -> feature_store.
+    """
+    files, todo = {}, []
+    for name in names:
+        dep, path = _module_file(module.__dict__[name], root)
+        if dep is not None and dep is not module:
+            todo.append((dep, path))
+    while todo:
+        dep, path = todo.pop()
+        if path in files:
+            continue
+        files[path] = dep
+        for obj in list(vars(dep).values()):
+            nested, nested_path = _module_file(obj, root)
+            if nested is not None and nested_path not in files:
+                todo.append((nested, nested_path))
+    return sorted(files)
+
+
+def code_fingerprint(cls, method_name):
+    """
+    Source of a method plus every self.<method>() it calls, transitively, and the contents of
+    the project modules that code uses (holt.py, scenarios.py, ... and what they import), so
+    editing a helper invalidates exactly the stages that use it.
+    """
+    seen, todo, parts = set(), [method_name], []
+    while todo:
+        name = todo.pop()
+        if name in seen or not callable(getattr(cls, name, None)):
+            continue
+        seen.add(name)
+        try:
+            src = inspect.getsource(getattr(cls, name))
+        except (OSError, TypeError):
+            continue
+        parts.append(src)
+        todo.extend(re.findall(r'self\.(\w+)\(', src))
+
+    module = sys.modules.get(cls.__module__)
+    if module is not None and getattr(module, '__file__', None):
+        root = os.path.dirname(os.path.realpath(module.__file__))
+        used = set(re.findall(r'\b\w+\b', ''.join(parts))) & set(vars(module))
+        for path in _project_files(module, used, root):
+            with open(path, 'rb') as f:
+                parts.append(hashlib.sha256(f.read()).hexdigest())
+    return hashlib.sha256(''.join(sorted(parts)).encode('utf-8')).hexdigest()
+
+
+def file_hashes(paths):
+    """Content hash of each file (None when it is missing), so a stage's files can be verified."""
+    hashes = {}
+    for path in paths:
+        if not os.path.exists(path):
+            hashes[path] = None
+            continue
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        hashes[path] = h.hexdigest()
+    return hashes
+
+
+class ArtifactStore:
+    """Pickled stage outputs, one file per stage holding the artifact of its latest key."""
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+
+    def _path(self, stage_name):
+        slug = ''.join(ch if ch.isalnum() else '_' for ch in stage_name)
+        return os.path.join(self.root, f"{slug}.pkl")
+
+    def load(self, stage_name, key):
+        path = self._path(stage_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except Exception:
+            return None
+        return payload if payload.get('key') == key else None
+
+    def save(self, stage_name, key, payload):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(stage_name)
+        # Write then rename, so an interrupted run never leaves a truncated artifact
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(dict(payload, key=key), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+class _Tee(io.TextIOBase):
+    """stdout that is also recorded, so a skipped stage can replay its console output."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = io.StringIO()
+
+    def write(self, text):
+        self.buffer.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _execute_stage(cls, state, method, params, outputs):
+    """
+    Worker side of a concurrent stage: rebuild a bare target from its read-only inputs,
+    run the method with stdout captured, and send back only the declared outputs.
+    """
+    target = cls.__new__(cls)
+    target.__dict__.update(state)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        result = getattr(target, method)(**params)
+    return {attr: getattr(target, attr, None) for attr in outputs}, log.getvalue(), result
+
+
+class Pipeline:
+    """
+    Runs stages against one target object. The dependency DAG is implied by which earlier
+    stage produces each input attribute.
+
+    Each stage gets a key: hash of its code, its params and the keys of the stages producing
+    its inputs (source_key for the first one). When the key matches the stored artifact and
+    the stage's files still have the content hashes recorded with it, the outputs are restored
+    instead of recomputed and the recorded console output is replayed. A stage returning False
+    stops the pipeline.
+
+    With max_workers > 1, stages are grouped into waves of mutually independent stages and
+    each wave's stages run concurrently in worker processes. A worker receives a copy of the
+    stage's inputs (plus the current value of its outputs) and returns its outputs, which are
+    merged back in declared order, so results match a sequential run. Console output of a
+    concurrent wave is printed once the wave is done, in declared order.
+    """
+    def __init__(self, target, stages, source_key='', store=None, use_cache=True, max_workers=1):
+        self.target = target
+        self.stages = stages
+        self.source_key = source_key
+        self.store = store or ArtifactStore()
+        self.use_cache = use_cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _stage_key(self, stage, producers):
+        h = hashlib.sha256()
+        h.update(stage.name.encode('utf-8'))
+        h.update(code_fingerprint(type(self.target), stage.method).encode('utf-8'))
+        h.update(repr(sorted(stage.params.items())).encode('utf-8'))
+        upstream = sorted({producers.get(attr, self.source_key) for attr in stage.inputs}) or [self.source_key]
+        for key in upstream:
+            h.update(key.encode('utf-8'))
+        return h.hexdigest()
+
+    def plan(self, rebuild=()):
+        """
+        [(stage, key, forced, wave)] in declared order. A stage's wave comes after the waves of the
+        stages producing its inputs, and never before an earlier stage that reads or writes one
+        of its outputs (so it cannot overwrite a value that stage still needs).
+        """
+        producers, writer_wave, reader_wave = {}, {}, {}
+        dirty = set()
+        plan = []
+        for stage in self.stages:
+            key = self._stage_key(stage, producers)
+            forced = stage.name in rebuild or any(attr in dirty for attr in stage.inputs)
+            if forced:
+                dirty.update(stage.outputs)
+            
+            wave = max([writer_wave[a] + 1 for a in stage.inputs if a in writer_wave] +
+                       [reader_wave.get(a, 0) for a in stage.outputs] +
+                       [writer_wave.get(a, 0) for a in stage.outputs] + [0])
+            plan.append((stage, key, forced, wave))
+            
+            for attr in stage.inputs:
+                reader_wave[attr] = max(reader_wave.get(attr, 0), wave)
+            for attr in stage.outputs:
+                producers[attr] = key
+                writer_wave[attr] = wave
+        return plan
+
+    def _cached(self, stage, key, forced):
+        if not (self.use_cache and stage.cache) or forced or not all(os.path.exists(p) for p in stage.files):
+            return None
+        payload = self.store.load(stage.name, key)
+        # The files must still be the ones this stage wrote (another run or mode may have replaced them)
+        if payload is not None and payload.get('files') != file_hashes(stage.files):
+            print(f"[cache] {stage.name}: output files changed since the artifact was saved, recomputing")
+            return None
+        return payload
+
+    def _finish(self, stage, key, outputs, log, result, from_cache):
+        """Merge one stage's outputs into the target and persist them if freshly computed."""
+        for attr, value in outputs.items():
+            setattr(self.target, attr, value)
+        if not from_cache and stage.cache and self.use_cache and result is not False:
+            self.store.save(stage.name, key, {'outputs': outputs, 'log': log, 'result': result,
+                                              'files': file_hashes(stage.files)})
+
+    def _run_inline(self, stage, key, forced):
+        payload = self._cached(stage, key, forced)
+        if payload is not None:
+            print(f"[cache] {stage.name}: inputs unchanged, reusing artifact {key[:12]}")
+            sys.stdout.write(payload['log'])
+            self._finish(stage, key, payload['outputs'], payload['log'], payload['result'], True)
+            return payload['result']
+        tee = _Tee(sys.stdout)
+        with contextlib.redirect_stdout(tee):
+            result = getattr(self.target, stage.method)(**stage.params)
+        outputs = {attr: getattr(self.target, attr, None) for attr in stage.outputs}
+        self._finish(stage, key, outputs, tee.buffer.getvalue(), result, False)
+        return result
+
+    def _run_wave(self, wave, get_pool):
+        """Run one wave of independent stages concurrently; returns the last stage's result (False on stop)."""
+        futures, payloads = {}, {}
+        misses = []
+        for stage, key, forced in wave:
+            payload = self._cached(stage, key, forced)
+            if payload is not None:
+                payloads[stage.name] = payload
+            else:
+                misses.append(stage)
+        
+        if len(misses) > 1:
+            pool = get_pool()
+            for stage in misses:
+                # Read-only inputs, plus the current value of the outputs the method may update in place
+                state = {attr: getattr(self.target, attr) for attr in stage.inputs + stage.outputs if hasattr(self.target, attr)}
+                futures[stage.name] = pool.submit(_execute_stage, type(self.target), state, stage.method, stage.params, stage.outputs)
+        elif misses:
+            # A single stage to compute: run it here, nothing to overlap with
+            stage = misses[0]
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                result = getattr(self.target, stage.method)(**stage.params)
+            payloads[stage.name] = {'outputs': {attr: getattr(self.target, attr, None) for attr in stage.outputs},
+                                    'log': log.getvalue(), 'result': result, 'computed': True}
+        
+        result = None
+        stop = False
+        for stage, key, forced in wave:
+            if stage.name in payloads:
+                payload = payloads[stage.name]
+                from_cache = not payload.get('computed')
+                if from_cache:
+                    print(f"[cache] {stage.name}: inputs unchanged, reusing artifact {key[:12]}")
+                outputs, log, result = payload['outputs'], payload['log'], payload['result']
+            else:
+                outputs, log, result = futures[stage.name].result()
+                from_cache = False
+            sys.stdout.write(log)
+            self._finish(stage, key, outputs, log, result, from_cache)
+            stop = stop or result is False
+        return False if stop else result
+
+    def run(self, rebuild=()):
+        """Run (or restore) every stage; stages in `rebuild` and everything downstream always run."""
+        plan = self.plan(rebuild)
+        if self.max_workers <= 1:
+            waves = [[(stage, key, forced)] for stage, key, forced, _ in plan]
+        else:
+            waves = [[(stage, key, forced) for stage, key, forced, w in plan if w == n]
+                     for n in sorted({w for *_, w in plan})]
+        
+        result = None
+        pools = []
+        
+        def get_pool():
+            if not pools:
+                pools.append(ProcessPoolExecutor(max_workers=self.max_workers))
+            return pools[0]
+        
+        try:
+            for wave in waves:
+                if len(wave) == 1:
+                    result = self._run_inline(*wave[0])
+                else:
+                    result = self._run_wave(wave, get_pool)
+                if result is False:
+                    return False
+        finally:
+            for pool in pools:
+                pool.shutdown()
+        return result
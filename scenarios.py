@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Default stress set
+FX_SHOCKS = (-0.10, 0.10)
+DELAY_WEEKS = 2
+BASE_CASE = 'Base Case'
+
+
+class Scenario:
+    """
+    One what-if on the baseline forecast, as edits restricted to matching leaf series:
+    inflow/outflow multipliers and a delay (weeks) on outflows. `where` selects leaves by
+    dimension value, e.g. {'Curr.': 'EUR'}; an empty `where` matches every leaf.
+    """
+    def __init__(self, name, kind, where=None, inflow_factor=1.0, outflow_factor=1.0, outflow_delay=0):
+        self.name = name
+        self.kind = kind
+        self.where = dict(where or {})
+        self.inflow_factor = inflow_factor
+        self.outflow_factor = outflow_factor
+        self.outflow_delay = outflow_delay
+
+
+def default_scenarios(leaves, top_entities=(), fx_shocks=FX_SHOCKS, delay_weeks=DELAY_WEEKS):
+    """
+    Base case, an FX shock of each size per non-USD currency, a delay of every category's
+    outflows, and the loss of each top entity's inflows.
+    """
+    scenarios = [Scenario(BASE_CASE, 'base')]
+    if 'Curr.' in leaves.names:
+        for curr in sorted(set(leaves.get_level_values('Curr.').dropna()) - {'USD'}):
+            for shock in fx_shocks:
+                scenarios.append(Scenario(f"FX {shock:+.0%} {curr}", 'fx', {'Curr.': curr},
+                                          inflow_factor=1 + shock, outflow_factor=1 + shock))
+    if 'Category' in leaves.names:
+        for cat in sorted(set(leaves.get_level_values('Category').dropna())):
+            scenarios.append(Scenario(f"{cat} outflows +{delay_weeks}w", 'delay', {'Category': cat},
+                                      outflow_delay=delay_weeks))
+    for ent in top_entities:
+        scenarios.append(Scenario(f"Lost inflow {ent}", 'lost_inflow', {'Name': ent}, inflow_factor=0.0))
+    return scenarios
+
+
+def reconcile_to_total(inflow, outflow, total):
+    """
+    Scale a signed baseline (inflows >= 0, outflows <= 0, leaf x week) so each week's net
+    equals `total` (one value per week, e.g. the published Base Case forecast). The side that
+    is short is scaled up: inflows when the total is above the leaf net, outflows when below,
+    so no leaf changes sign. Weeks where that side is all zero are left as they are.
+    Returns (inflow, outflow, unreconciled weeks).
+    """
+    total = np.asarray(total, dtype=float)
+    ins, outs = inflow.sum(axis=0).to_numpy(), outflow.sum(axis=0).to_numpy()
+    gap = total - (ins + outs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        in_factor = np.where((gap > 0) & (ins > 0), (total - outs) / ins, 1.0)
+        out_factor = np.where((gap < 0) & (outs < 0), (total - ins) / outs, 1.0)
+    missed = int(np.sum(((gap > 0) & (ins <= 0)) | ((gap < 0) & (outs >= 0))))
+    return inflow * in_factor, outflow * out_factor, missed
+
+
+class ScenarioEngine:
+    """
+    Applies many scenarios to one baseline at once. The baseline is a pair of (leaf x week)
+    forecast matrices, inflows and outflows, whose rows are labelled by a MultiIndex
+    (e.g. Name x Category x Activity x Curr.). Scenarios become (scenario x leaf) factor and
+    delay matrices, so every scenario, leaf and week is computed in one array expression.
+    """
+    def __init__(self, inflow, outflow):
+        self.leaves = inflow.index
+        self.dates = inflow.columns
+        self.inflow = inflow.to_numpy(dtype=float)
+        self.outflow = outflow.reindex(index=inflow.index, columns=inflow.columns, fill_value=0).to_numpy(dtype=float)
+
+    def _masks(self, scenarios):
+        """(scenario x leaf) boolean: which leaves each scenario touches."""
+        masks = np.ones((len(scenarios), len(self.leaves)), dtype=bool)
+        for k, sc in enumerate(scenarios):
+            for dim, value in sc.where.items():
+                if dim not in self.leaves.names:
+                    masks[k] = False
+                    continue
+                masks[k] &= np.asarray(self.leaves.get_level_values(dim) == value)
+        return masks
+
+    def run(self, scenarios):
+        """(inflow, outflow) arrays of shape (scenario x leaf x week)."""
+        masks = self._masks(scenarios)
+        in_factor = np.where(masks, np.array([sc.inflow_factor for sc in scenarios])[:, None], 1.0)
+        out_factor = np.where(masks, np.array([sc.outflow_factor for sc in scenarios])[:, None], 1.0)
+        delay = np.where(masks, np.array([sc.outflow_delay for sc in scenarios])[:, None], 0)
+
+        # Delayed outflows: week h pays what was due at h - delay (pushed past the horizon = later)
+        source = np.arange(len(self.dates))[None, None, :] - delay[:, :, None]
+        shifted = np.take_along_axis(np.broadcast_to(self.outflow, delay.shape + (len(self.dates),)),
+                                     np.clip(source, 0, None), axis=2)
+        shifted = np.where(source >= 0, shifted, 0.0)
+
+        inflow = in_factor[:, :, None] * self.inflow[None, :, :]
+        outflow = out_factor[:, :, None] * shifted
+        return inflow, outflow
+
+    def to_frame(self, scenarios, inflow, outflow):
+        """Long table: one row per scenario x leaf x week with inflow, outflow and net."""
+        k, s, h = inflow.shape
+        frame = pd.DataFrame({
+            'Scenario': np.repeat([sc.name for sc in scenarios], s * h),
+            'Scenario_Type': np.repeat([sc.kind for sc in scenarios], s * h),
+        })
+        leaf_codes = np.tile(np.repeat(np.arange(s), h), k)
+        for level, name in enumerate(self.leaves.names):
+            codes, values = pd.factorize(self.leaves.get_level_values(level))
+            frame[name] = pd.Categorical.from_codes(codes[leaf_codes], categories=values)
+        frame['Date'] = np.tile(np.asarray(self.dates), k * s)
+        frame['Inflow_USD'] = inflow.ravel()
+        frame['Outflow_USD'] = outflow.ravel()
+        frame['Net_USD'] = frame['Inflow_USD'] + frame['Outflow_USD']
+        frame['Scenario'] = frame['Scenario'].astype('category')
+        frame['Scenario_Type'] = frame['Scenario_Type'].astype('category')
+        return frame
+
+    def summary(self, scenarios, inflow, outflow):
+        """Total net flow per scenario over the horizon and its change vs the base case."""
+        net = (inflow + outflow).sum(axis=(1, 2))
+        base = net[[sc.kind for sc in scenarios].index('base')] if any(sc.kind == 'base' for sc in scenarios) else 0.0
+        return pd.DataFrame({
+            'Scenario': [sc.name for sc in scenarios],
+            'Scenario_Type': [sc.kind for sc in scenarios],
+            'Net_USD': net,
+            'Impact_vs_Base_USD': net - base
+        })
+
+
+def export_scenarios(frame, path):
+    """Write the scenario table as Parquet (or CSV next to it without pyarrow); returns the path."""
+    if HAS_PYARROW:
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path)
+        return path
+    csv_path = path.rsplit('.', 1)[0] + '.csv'
+    frame.to_csv(csv_path, index=False)
+    return csv_path
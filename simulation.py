@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+# Paths per series; quantiles reported for every forecast week
+DEFAULT_PATHS = 2000
+INTERVAL_QUANTILES = (5, 50, 95)
+
+
+def _residual_matrix(residual_pools):
+    """Ragged residual pools as a zero-padded (series x max_len) matrix plus the pool sizes."""
+    pools = [np.asarray(r, dtype=float)[np.isfinite(np.asarray(r, dtype=float))] for r in residual_pools]
+    counts = np.array([len(r) for r in pools])
+    matrix = np.zeros((len(pools), max(counts.max(initial=0), 1)))
+    for i, r in enumerate(pools):
+        matrix[i, :len(r)] = r
+    return matrix, counts
+
+
+def bootstrap_paths(base, residual_pools, n_paths=DEFAULT_PATHS, seed=42):
+    """
+    Sample paths for many series at once: base forecast (series x horizon) plus residuals
+    drawn with replacement from each series' own pool (its fitted model's errors).
+    Returns a (series x paths x horizon) array; series without residuals keep the base.
+    """
+    base = np.atleast_2d(np.asarray(base, dtype=float))
+    n_series, horizon = base.shape
+    matrix, counts = _residual_matrix(residual_pools)
+    rng = np.random.default_rng(seed)
+    draws = (rng.random((n_series, n_paths, horizon)) * np.maximum(counts, 1)[:, None, None]).astype(np.int64)
+    noise = np.take_along_axis(matrix[:, None, :], draws.reshape(n_series, 1, -1), axis=2).reshape(draws.shape)
+    noise[counts == 0] = 0.0
+    return base[:, None, :] + noise
+
+
+def path_quantiles(paths, index=None, quantiles=INTERVAL_QUANTILES, cumulative=False, start=0.0):
+    """
+    P5/P50/P95 (by default) per series and week as a list of DataFrames (weeks x 'p5', 'p50', 'p95').
+    cumulative=True sums each path over time first (e.g. running cash position from `start`).
+    """
+    values = start + np.cumsum(paths, axis=2) if cumulative else paths
+    q = np.percentile(values, quantiles, axis=1)  # (quantiles x series x horizon)
+    columns = [f"p{int(x)}" for x in quantiles]
+    return [pd.DataFrame(q[:, i, :].T, index=index, columns=columns) for i in range(values.shape[0])]
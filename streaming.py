@@ -0,0 +1,74 @@
+import pandas as pd
+import numpy as np
+
+# Rows per chunk in streaming mode; peak memory scales with this, not with the ledger size
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+class WeeklyAccumulator:
+    """
+    Running partial sums of value_col per group (e.g. week x Category x Activity), fed one chunk
+    at a time. Only per-group totals are kept, so memory is bounded by the number of groups,
+    not by the number of transactions.
+    """
+    def __init__(self, group_cols, value_col, compact_every=16):
+        self.group_cols = list(group_cols)
+        self.value_col = value_col
+        self.compact_every = compact_every
+        self.n_rows = 0
+        self._parts = []
+
+    def add(self, chunk):
+        """Fold one chunk of transactions into the running totals."""
+        part = chunk.groupby(self.group_cols, observed=True)[self.value_col].sum().reset_index()
+        # Categories differ from chunk to chunk; plain values concatenate without upcasting surprises
+        for col in self.group_cols:
+            if isinstance(part[col].dtype, pd.CategoricalDtype):
+                part[col] = part[col].astype(part[col].cat.categories.dtype)
+        self._parts.append(part)
+        self.n_rows += len(chunk)
+        if len(self._parts) >= self.compact_every:
+            self._parts = [self._combine()]
+
+    def _combine(self):
+        if not self._parts:
+            return pd.DataFrame(columns=self.group_cols + [self.value_col])
+        merged = pd.concat(self._parts, ignore_index=True)
+        return merged.groupby(self.group_cols).agg({self.value_col: 'sum'}).reset_index()
+
+    def result(self, categorical=None):
+        """Final totals sorted by the first group column; `categorical` columns are cast to category."""
+        out = self._combine()
+        for col in categorical or []:
+            if col in out.columns:
+                out[col] = out[col].astype('category')
+        return out.sort_values(self.group_cols[0])
+
+
+class DuplicateKeyState:
+    """
+    Cross-chunk state for the exact duplicate flag: the number of rows seen per duplicate key.
+    Keys are stored as 64-bit hashes, so the state is one integer pair per distinct key
+    instead of the rows themselves (a collision needs ~2^32 distinct keys to become likely).
+    """
+    def __init__(self, key_cols):
+        self.key_cols = list(key_cols)
+        self._counts = {}
+
+    def add(self, chunk):
+        """Count the keys of one chunk."""
+        hashes = pd.util.hash_pandas_object(chunk[self.key_cols], index=False)
+        keys, counts = np.unique(hashes.to_numpy(), return_counts=True)
+        get = self._counts.get
+        for key, n in zip(keys.tolist(), counts.tolist()):
+            self._counts[key] = get(key, 0) + n
+
+    def summary(self):
+        """Distinct keys, keys seen more than once, and rows that the full-frame flag would mark."""
+        counts = np.fromiter(self._counts.values(), dtype=np.int64, count=len(self._counts))
+        dupes = counts[counts > 1]
+        return {
+            'distinct_keys': int(len(counts)),
+            'duplicate_keys': int(len(dupes)),
+            'duplicate_rows': int(dupes.sum())
+        }
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+cash_flow_analysis = pytest.importorskip('cash_flow_analysis')
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    # The Isolation Forest is registered under ./.cache/models
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(1)
+    n = 200
+    df = pd.DataFrame({
+        'DocumentNo': np.arange(n),
+        'Name': [f"E{i % 40:03d}" for i in range(n)],
+        'Curr.': 'USD',
+        'Category': rng.choice(['AP', 'AR', 'Payroll'], n),
+        'posting_date': pd.Timestamp('2025-01-06') + pd.to_timedelta(rng.integers(0, 60, n), unit='D'),
+        'Amount in USD': np.round(rng.normal(0, 300, n), 2),
+        'is_potential_duplicate': False,
+    })
+    evidence = pd.DataFrame([
+        # Flagged exact duplicate (cleaning step)
+        [900, 'DUPE', 'USD', 'AP', '2025-02-03', -512.25, True],
+        [901, 'DUPE', 'USD', 'AP', '2025-02-03', -512.25, True],
+        # Strong near-duplicate: $0.30, one day apart
+        [902, 'NEAR', 'USD', 'AP', '2025-02-03', -415.10, False],
+        [903, 'NEAR', 'USD', 'AP', '2025-02-04', -415.40, False],
+        # Weak pair: $0.95, two days apart
+        [904, 'WEAK', 'USD', 'AP', '2025-02-03', -311.00, False],
+        [905, 'WEAK', 'USD', 'AP', '2025-02-05', -311.95, False],
+    ], columns=df.columns)
+    evidence['posting_date'] = pd.to_datetime(evidence['posting_date'])
+    target = cash_flow_analysis.CashFlowAnalyzer('unused.csv')
+    target.df = pd.concat([df, evidence], ignore_index=True)
+    return target
+
+
+def test_near_duplicates_get_their_own_label(analyzer):
+    analyzer.detect_anomalies()
+    label = analyzer.df.set_index('DocumentNo')['anomaly_type']
+    score = analyzer.df.set_index('DocumentNo')['duplicate_score']
+
+    # Exact duplicates keep the cleaning-step label even though their pair scores 1.0
+    assert label.loc[[900, 901]].tolist() == ['Duplicate Payment'] * 2
+    assert score.loc[900] == 1.0
+    assert label.loc[[902, 903]].tolist() == ['Near-Duplicate'] * 2
+    # Weak pairs are kept as evidence only
+    assert 0 < score.loc[904] < cash_flow_analysis.NEAR_DUPLICATE_THRESHOLD
+    assert label.loc[[904, 905]].isna().all()
+
+
+def test_near_duplicate_never_overwrites(analyzer):
+    analyzer.detect_anomalies()
+    strong = analyzer.df['duplicate_score'] >= cash_flow_analysis.NEAR_DUPLICATE_THRESHOLD
+    labelled = analyzer.df.loc[strong, 'anomaly_type']
+    assert labelled.notna().all()
+    # Every other label on a strong row came from an earlier check, not from the near-duplicate pass
+    flagged = analyzer.df['is_potential_duplicate'].astype(bool)
+    assert (labelled[flagged.loc[strong]] == 'Duplicate Payment').all()
+    assert set(analyzer.anomalies['anomaly_type']) <= {
+        'Duplicate Payment', 'Near-Duplicate', 'Statistical Anomaly (IsoForest)', 'Round Number Risk'}
+    assert analyzer.anomalies['risk_score'].notna().all()
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from duplicate_detection import NEAR_DUPLICATE_THRESHOLD, duplicate_scores, find_duplicate_pairs
+
+
+def _ledger(rows):
+    return pd.DataFrame(rows, columns=['DocumentNo', 'Name', 'Curr.', 'posting_date', 'Amount in USD'])
+
+
+def _naive_pairs(df, amount_tol=1.0, day_window=2):
+    """O(n^2) reference: every pair in the same entity/currency within both tolerances."""
+    days = pd.to_datetime(df['posting_date']).to_numpy().astype('datetime64[D]').view(np.int64)
+    found = set()
+    for i in range(len(df)):
+        for j in range(i + 1, len(df)):
+            if (df['Name'].iat[i], df['Curr.'].iat[i]) != (df['Name'].iat[j], df['Curr.'].iat[j]):
+                continue
+            if abs(df['Amount in USD'].iat[i] - df['Amount in USD'].iat[j]) <= amount_tol + 1e-9 \
+                    and abs(days[i] - days[j]) <= day_window:
+                found.add((i, j))
+    return found
+
+
+def test_pairs_match_naive_scan():
+    rng = np.random.default_rng(0)
+    n = 300
+    df = _ledger({
+        'DocumentNo': np.arange(n),
+        'Name': rng.choice(['TW10', 'KR10', 'MY10'], n),
+        'Curr.': rng.choice(['USD', 'TWD'], n),
+        'posting_date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 30, n), unit='D'),
+        'Amount in USD': np.round(rng.uniform(-50, 50, n), 2),
+    })
+    pairs = find_duplicate_pairs(df)
+    assert set(zip(pairs['row_a'], pairs['row_b'])) == _naive_pairs(df)
+    assert (pairs['row_a'] < pairs['row_b']).all()
+
+
+def test_similarity_and_threshold():
+    df = _ledger([
+        [1, 'TW10', 'USD', '2025-01-06', 500.00],
+        [2, 'TW10', 'USD', '2025-01-06', 500.00],   # exact re-post
+        [3, 'KR10', 'USD', '2025-01-06', 800.00],
+        [4, 'KR10', 'USD', '2025-01-07', 800.40],   # strong: $0.40, one day apart
+        [5, 'MY10', 'USD', '2025-01-06', 900.00],
+        [6, 'MY10', 'USD', '2025-01-08', 900.90],   # weak: $0.90, two days apart
+        [7, 'MY10', 'EUR', '2025-01-06', 900.00],   # other currency: never paired with 5
+    ])
+    pairs = find_duplicate_pairs(df).set_index(['row_a', 'row_b'])
+    assert set(pairs.index) == {(0, 1), (2, 3), (4, 5)}
+    assert pairs.loc[(0, 1), 'is_exact'] and pairs.loc[(0, 1), 'similarity'] == 1.0
+
+    scores = duplicate_scores(len(df), pairs.reset_index())
+    strong = scores >= NEAR_DUPLICATE_THRESHOLD
+    assert strong.tolist() == [True, True, True, True, False, False, False]
+    assert scores[6] == 0
+
+
+def test_no_candidates():
+    df = _ledger([[1, 'TW10', 'USD', '2025-01-06', 10.0], [2, 'TW10', 'USD', '2025-02-06', 10.0]])
+    pairs = find_duplicate_pairs(df)
+    assert pairs.empty and list(pairs.columns)[:2] == ['row_a', 'row_b']
+    assert duplicate_scores(len(df), pairs).tolist() == [0.0, 0.0]
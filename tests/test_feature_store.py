@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from feature_store import FeatureStore, lag_matrix, panel_features, rolling_mean_std
+
+
+def _naive_features(y, lookback, window, period):
+    rows, origins = [], []
+    for t in range(max(lookback, window) - 1, len(y)):
+        hist = y[t - window + 1:t + 1]
+        week = t + 1
+        rows.append([y[t - k] for k in range(lookback)] +
+                    [week, hist.mean(), hist.std(ddof=1),
+                     np.sin(2 * np.pi * week / period), np.cos(2 * np.pi * week / period)])
+        origins.append(t)
+    return np.array(rows), np.array(origins)
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(3)
+    return rng.normal(1e6, 5e4, (4, 30))
+
+
+def test_panel_features_match_naive(panel):
+    X, origins = panel_features(panel, lookback=8, window=4, period=52)
+    for s in range(len(panel)):
+        expected, expected_origins = _naive_features(panel[s], 8, 4, 52)
+        np.testing.assert_array_equal(origins, expected_origins)
+        np.testing.assert_allclose(X[s], expected, rtol=1e-9)
+
+
+def test_rolling_stats_and_lags(panel):
+    mean, std = rolling_mean_std(panel, 5)
+    np.testing.assert_allclose(mean[:, 0], panel[:, :5].mean(axis=1))
+    np.testing.assert_allclose(std[:, -1], panel[:, -5:].std(axis=1, ddof=1))
+    lags = lag_matrix(panel, 3)
+    np.testing.assert_array_equal(lags[:, 0], panel[:, [2, 1, 0]])
+
+
+def test_too_short_series():
+    X, origins = panel_features(np.ones((2, 5)), lookback=8, window=4, period=52)
+    assert X.shape == (2, 0, 13) and len(origins) == 0
+
+
+def test_store_builds_each_series_once(panel):
+    store = FeatureStore()
+    first, _ = store.panel(panel, 8, 4, 52)
+    assert (store.builds, store.hits) == (4, 0)
+    single, _ = store.series(panel[2], 8, 4, 52)
+    np.testing.assert_array_equal(single, first[2])
+    assert (store.builds, store.hits) == (4, 1)
+    # A different layout is a different entry
+    store.series(panel[2], 6, 4, 52)
+    assert store.builds == 5
+
+
+def test_store_evicts_oldest(panel):
+    store = FeatureStore(max_series=2)
+    for row in panel:
+        store.series(row, 8, 4, 52)
+    assert len(store._cache) == 2
+    store.series(panel[0], 8, 4, 52)
+    assert store.builds == 5
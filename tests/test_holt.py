@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from holt import holt_recursion, optimize_holt, optimize_holt_batch
+
+
+def _holt_scalar(values, a, b):
+    """The original one-series, one-(alpha, beta) loop."""
+    level, trend = values[0], 0.0
+    for val in values:
+        last_level = level
+        level = a * val + (1 - a) * (last_level + trend)
+        trend = b * (level - last_level) + (1 - b) * trend
+    return level, trend
+
+
+def _grid_search_scalar(values, alphas, betas, horizon=4):
+    train, valid = values[:-horizon], values[-horizon:]
+    best = (None, None, np.inf)
+    for a in alphas:
+        for b in betas:
+            level, trend = _holt_scalar(train, a, b)
+            preds = level + trend * np.arange(1, horizon + 1)
+            rmse = np.sqrt(np.mean((valid - preds) ** 2))
+            if rmse < best[2]:
+                best = (a, b, rmse)
+    return best
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(7)
+    return np.cumsum(rng.normal(0, 10, (5, 40)), axis=1) + np.linspace(0, 50, 40)
+
+
+def test_recursion_matches_scalar_loop(panel):
+    alphas, betas = np.array([0.1, 0.5, 0.9]), np.array([0.1, 0.3, 0.2])
+    level, trend = holt_recursion(panel, alphas, betas)
+    for s in range(len(panel)):
+        for p in range(len(alphas)):
+            assert (level[s, p], trend[s, p]) == pytest.approx(_holt_scalar(panel[s], alphas[p], betas[p]))
+
+
+def test_recursion_paths_end_at_final_state(panel):
+    level, trend, path, trend_path = holt_recursion(panel, [0.3], [0.2], return_path=True, return_trend_path=True)
+    assert path.shape == (5, 1, 40)
+    np.testing.assert_allclose(path[..., -1], level)
+    np.testing.assert_allclose(trend_path[..., -1], trend)
+
+
+def test_batch_grid_search_matches_scalar(panel):
+    alphas, betas = [0.1, 0.3, 0.5, 0.7, 0.9], [0.1, 0.2, 0.3, 0.4]
+    best_a, best_b, best_rmse, surface = optimize_holt_batch(panel, alphas, betas)
+    assert surface.shape == (5, 5, 4)
+    for s in range(len(panel)):
+        a, b, rmse = _grid_search_scalar(panel[s], alphas, betas)
+        assert (best_a[s], best_b[s]) == (a, b)
+        assert best_rmse[s] == pytest.approx(rmse)
+
+
+def test_refine_never_worse(panel):
+    _, _, coarse, _ = optimize_holt_batch(panel, refine=0)
+    _, _, fine, _ = optimize_holt_batch(panel, refine=2)
+    assert (fine <= coarse + 1e-12).all()
+
+
+def test_short_series_keeps_fallback():
+    a, b, rmse, surface = optimize_holt([1.0, 2.0, 3.0])
+    assert (a, b) == (0.3, 0.2) and np.isnan(rmse) and surface.empty
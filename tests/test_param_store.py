@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from param_store import ParamStore, series_fingerprint
+
+
+def _store(tmp_path, tuned_days_ago=0, mae=100.0):
+    store = ParamStore(str(tmp_path / 'hyperparams.json'))
+    store.put('xgboost:total', {'max_depth': 3}, 'abc', mae)
+    store.entries['xgboost:total']['tuned_at'] = (datetime.now() - timedelta(days=tuned_days_ago)).isoformat()
+    return store
+
+
+def test_missing_entry(tmp_path):
+    assert ParamStore(str(tmp_path / 'none.json')).tuning_reason('xgboost:total', 'abc') == "no stored parameters"
+
+
+def test_same_data_never_retunes(tmp_path):
+    store = _store(tmp_path, tuned_days_ago=30)
+    assert store.tuning_reason('xgboost:total', 'abc', mae=1e9) is None
+
+
+def test_new_data_recent_and_stable(tmp_path):
+    store = _store(tmp_path, tuned_days_ago=1)
+    assert store.tuning_reason('xgboost:total', 'def', mae=110.0) is None
+
+
+def test_new_data_stale_params(tmp_path):
+    store = _store(tmp_path, tuned_days_ago=8)
+    assert store.tuning_reason('xgboost:total', 'def') == "parameters are 8 days old"
+
+
+def test_new_data_drifted_mae(tmp_path):
+    store = _store(tmp_path, tuned_days_ago=1)
+    assert store.tuning_reason('xgboost:total', 'def', mae=130.0) == "backtest MAE drifted +30%"
+
+
+def test_entries_persist(tmp_path):
+    _store(tmp_path)
+    with open(tmp_path / 'hyperparams.json', encoding='utf-8') as f:
+        assert json.load(f)['xgboost:total']['params'] == {'max_depth': 3}
+    assert ParamStore(str(tmp_path / 'hyperparams.json')).get('xgboost:total')['mae'] == 100.0
+
+
+def test_fingerprint_tracks_values_and_dates():
+    idx = pd.date_range('2025-01-06', periods=3, freq='W-MON')
+    base = series_fingerprint(pd.Series([1.0, 2.0, 3.0], index=idx))
+    assert base == series_fingerprint(pd.Series([1.0, 2.0, 3.0], index=idx))
+    assert base != series_fingerprint(pd.Series([1.0, 2.0, 4.0], index=idx))
+    assert base != series_fingerprint(pd.Series([1.0, 2.0, 3.0], index=idx + pd.Timedelta(days=7)))
@@ -0,0 +1,118 @@
+import importlib
+import sys
+
+import pytest
+
+from pipeline import ArtifactStore, Pipeline, Stage, code_fingerprint
+
+
+class Report:
+    """Minimal pipeline target: one stage computing a value, one writing it to a file."""
+    def __init__(self, values, path):
+        self.values = values
+        self.path = path
+        self.calls = []
+
+    def summarise(self):
+        self.calls.append('summarise')
+        self.total = sum(self.values)
+
+    def export(self):
+        self.calls.append('export')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(f"total,{self.total}\n")
+
+
+def _pipeline(target, tmp_path, source_key='v1'):
+    stages = [Stage('summary', 'summarise', inputs=['values'], outputs=['total']),
+              Stage('export', 'export', inputs=['total'], files=[target.path])]
+    return Pipeline(target, stages, source_key=source_key, store=ArtifactStore(str(tmp_path / 'artifacts')))
+
+
+def test_warm_run_restores_outputs(tmp_path):
+    path = str(tmp_path / 'report.csv')
+    _pipeline(Report([1, 2, 3], path), tmp_path).run()
+
+    again = Report([1, 2, 3], path)
+    _pipeline(again, tmp_path).run()
+    assert again.calls == [] and again.total == 6
+
+
+def test_new_source_recomputes(tmp_path):
+    path = str(tmp_path / 'report.csv')
+    _pipeline(Report([1, 2, 3], path), tmp_path).run()
+
+    again = Report([1, 2, 4], path)
+    _pipeline(again, tmp_path, source_key='v2').run()
+    assert again.calls == ['summarise', 'export'] and again.total == 7
+
+
+def test_replaced_output_file_is_rewritten(tmp_path, capsys):
+    path = str(tmp_path / 'report.csv')
+    _pipeline(Report([1, 2, 3], path), tmp_path).run()
+    # Another run (e.g. a different mode) overwrote the file after the artifact was saved
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("total,partial\n")
+
+    again = Report([1, 2, 3], path)
+    _pipeline(again, tmp_path).run()
+    assert again.calls == ['export']
+    assert "output files changed" in capsys.readouterr().out
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == "total,6\n"
+
+
+def test_missing_output_file_is_rewritten(tmp_path):
+    path = tmp_path / 'report.csv'
+    _pipeline(Report([1, 2, 3], str(path)), tmp_path).run()
+    path.unlink()
+
+    again = Report([1, 2, 3], str(path))
+    _pipeline(again, tmp_path).run()
+    assert again.calls == ['export'] and path.exists()
+
+
+def test_rebuild_forces_downstream(tmp_path):
+    path = str(tmp_path / 'report.csv')
+    _pipeline(Report([1, 2, 3], path), tmp_path).run()
+
+    again = Report([1, 2, 3], path)
+    _pipeline(again, tmp_path).run(rebuild=['summary'])
+    assert again.calls == ['summarise', 'export']
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A throwaway project: an analyzer module whose method calls a helper module."""
+    (tmp_path / 'helper_mod.py').write_text("def scale(x):\n    return 2 * x\n")
+    (tmp_path / 'analyzer_mod.py').write_text(
+        "import helper_mod\n\n"
+        "class Analyzer:\n"
+        "    def run(self):\n"
+        "        return self._step()\n\n"
+        "    def _step(self):\n"
+        "        return helper_mod.scale(1)\n\n"
+        "    def other(self):\n"
+        "        return 0\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = importlib.import_module('analyzer_mod')
+    yield tmp_path, module.Analyzer
+    sys.modules.pop('analyzer_mod', None)
+    sys.modules.pop('helper_mod', None)
+
+
+def test_helper_module_edit_changes_key(project):
+    root, Analyzer = project
+    before_run, before_other = code_fingerprint(Analyzer, 'run'), code_fingerprint(Analyzer, 'other')
+    (root / 'helper_mod.py').write_text("def scale(x):\n    return 3 * x\n")
+    # Only the method that (transitively) uses the helper is invalidated
+    assert code_fingerprint(Analyzer, 'run') != before_run
+    assert code_fingerprint(Analyzer, 'other') == before_other
+
+
+def test_stage_params_change_key(tmp_path):
+    target = Report([1], str(tmp_path / 'r.csv'))
+    stage = Stage('summary', 'summarise', inputs=['values'], outputs=['total'])
+    plain = Pipeline(target, [stage]).plan()[0][1]
+    tuned = Pipeline(target, [stage.with_params(scale=2)]).plan()[0][1]
+    assert plain != tuned
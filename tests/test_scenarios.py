@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from scenarios import BASE_CASE, Scenario, ScenarioEngine, reconcile_to_total
+
+
+def _baseline():
+    leaves = pd.MultiIndex.from_tuples([('TW10', 'EUR'), ('KR10', 'USD')], names=['Name', 'Curr.'])
+    dates = pd.date_range('2025-01-06', periods=3, freq='W-MON')
+    inflow = pd.DataFrame([[100.0, 100.0, 0.0], [50.0, 0.0, 0.0]], index=leaves, columns=dates)
+    outflow = pd.DataFrame([[-40.0, -40.0, -40.0], [-10.0, -10.0, 0.0]], index=leaves, columns=dates)
+    return inflow, outflow
+
+
+def test_reconcile_scales_short_side_only():
+    inflow, outflow = _baseline()
+    # Leaf net per week: 100, 50, -40
+    total = [130.0, 30.0, 10.0]
+    ins, outs, missed = reconcile_to_total(inflow, outflow, total)
+
+    np.testing.assert_allclose((ins + outs).sum(axis=0).to_numpy()[:2], total[:2])
+    # Week 1 above the leaf net: inflows scaled up, outflows untouched
+    np.testing.assert_allclose(outs.iloc[:, 0], outflow.iloc[:, 0])
+    # Week 2 below: outflows scaled up, inflows untouched
+    np.testing.assert_allclose(ins.iloc[:, 1], inflow.iloc[:, 1])
+    # Week 3 needs more inflow but has none: left as is and reported
+    assert missed == 1
+    np.testing.assert_allclose(ins.iloc[:, 2], inflow.iloc[:, 2])
+    assert (ins.to_numpy() >= 0).all() and (outs.to_numpy() <= 0).all()
+
+
+def test_engine_applies_masks_and_delay():
+    inflow, outflow = _baseline()
+    scenarios = [Scenario(BASE_CASE, 'base'),
+                 Scenario('FX -10% EUR', 'fx', {'Curr.': 'EUR'}, inflow_factor=0.9, outflow_factor=0.9),
+                 Scenario('Delay', 'delay', {'Name': 'KR10'}, outflow_delay=1)]
+    engine = ScenarioEngine(inflow, outflow)
+    ins, outs = engine.run(scenarios)
+    assert ins.shape == (3, 2, 3)
+
+    np.testing.assert_allclose(ins[0], inflow.to_numpy())
+    np.testing.assert_allclose(ins[1, 0], 0.9 * inflow.to_numpy()[0])
+    np.testing.assert_allclose(ins[1, 1], inflow.to_numpy()[1])
+    np.testing.assert_allclose(outs[2, 1], [0.0, -10.0, -10.0])
+    np.testing.assert_allclose(outs[2, 0], outflow.to_numpy()[0])
+
+    summary = engine.summary(scenarios, ins, outs).set_index('Scenario')
+    assert summary.loc[BASE_CASE, 'Impact_vs_Base_USD'] == 0
+    assert summary.loc['FX -10% EUR', 'Impact_vs_Base_USD'] == np.float64(-0.1 * (200 - 120))